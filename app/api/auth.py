@@ -9,8 +9,13 @@ from ..models.responses import (
     SuccessResponse, ErrorResponse, AuthResponse,
     UserResponse as UserResponseModel, STANDARD_RESPONSES
 )
+from ..config import settings
 from ..database import get_db
+from ..database.routing import load_sticky_state
 from ..utils.jwt_utils import JWTUtils
+from ..utils.auth_cache import CurrentUser, verify_token_cached, get_cached_user, cache_user
+from ..utils.revocation import revocation_list
+from ..services.quota_service import quota_service
 from ..utils.exceptions import (
     AuthenticationException, ValidationException, BusinessException, APIException
 )
@@ -38,12 +43,12 @@ class UserResponse(BaseModel):
 # 使用标准响应模型，移除旧的AuthResponse定义
 
 # 依赖函数
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> CurrentUser:
     """
-    获取当前认证用户
+    获取当前认证用户（令牌验证结果和活跃用户记录均有缓存）
     """
     token = credentials.credentials
-    payload = JWTUtils.verify_token(token)
+    payload = verify_token_cached(token)
     
     if not payload:
         raise HTTPException(
@@ -52,13 +57,33 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.id == payload['user_id'], User.is_active == True).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+    user = None
+    if settings.auth_stateless:
+        # 无状态模式：信任令牌声明，仅检查吊销列表（通常不产生网络I/O）
+        revoked = await revocation_list.is_revoked(payload['user_id'], payload.get('jti'))
+        if revoked:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if revoked is False:
+            user = CurrentUser.from_claims(payload)
+
+    if user is None:
+        user = await get_cached_user(payload['user_id'])
+    if user is None:
+        db_user = db.query(User).filter(User.id == payload['user_id'], User.is_active == True).first()
+        if not db_user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        user = await cache_user(db_user)
     
+    # 供读写分离会话实现写后读主库（跨进程的粘滞状态在此异步加载，同步代码中不访问Redis）
+    db.info["user_id"] = user.id
+    await load_sticky_state(db, user.id)
     return user
 
 @router.post("/register",
@@ -93,7 +118,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)) -> Su
             raise BusinessException("用户名已存在", "USERNAME_EXISTS")
 
         # 哈希密码
-        password_hash = PasswordUtils.hash_password(password)
+        password_hash = await PasswordUtils.hash_password_async(password)
 
         # 创建新用户
         new_user = User(username=username, password_hash=password_hash)
@@ -102,9 +127,9 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)) -> Su
         db.refresh(new_user)
         
         # 生成JWT令牌
-        token = JWTUtils.generate_token(new_user.id, new_user.username)
+        token = JWTUtils.generate_token(new_user.id, new_user.username, new_user.user_id, new_user.created_at)
         
-        logger.info(f"New user registered: {new_user.username} (ID: {new_user.user_id})")
+        logger.info("New user registered: {} (ID: {})", new_user.username, new_user.user_id)
         
         return SuccessResponse(
             data={
@@ -160,13 +185,22 @@ async def login(login_data: UserLogin, db: Session = Depends(get_db)) -> Success
             raise AuthenticationException("用户名或密码错误")
 
         # 验证密码
-        if not PasswordUtils.verify_password(password, user.password_hash):
+        if not await PasswordUtils.verify_password_async(password, user.password_hash):
             raise AuthenticationException("用户名或密码错误")
+
+        # 哈希cost低于当前配置时透明升级
+        if PasswordUtils.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = await PasswordUtils.hash_password_async(password)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.warning("Password rehash failed for user {}: {}", user.user_id, e)
         
         # 生成JWT令牌
-        token = JWTUtils.generate_token(user.id, user.username)
+        token = JWTUtils.generate_token(user.id, user.username, user.user_id, user.created_at)
 
-        logger.info(f"User logged in: {user.username} (ID: {user.user_id})")
+        logger.info("User logged in: {} (ID: {})", user.username, user.user_id)
 
         return SuccessResponse(
             data={
@@ -188,7 +222,7 @@ async def login(login_data: UserLogin, db: Session = Depends(get_db)) -> Success
         raise APIException("登录过程中发生错误", "LOGIN_ERROR", 500)
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: CurrentUser = Depends(get_current_user)):
     """
     获取当前用户信息
     """
@@ -196,4 +230,12 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
         username=current_user.username,
         user_id=current_user.user_id,
         created_at=current_user.created_at.isoformat()
-    )
\ No newline at end of file
+    )
+
+
+@router.get("/me/usage", response_model=SuccessResponse)
+async def get_current_user_usage(current_user: CurrentUser = Depends(get_current_user)) -> SuccessResponse:
+    """
+    获取当前用户的生成配额使用情况
+    """
+    return SuccessResponse(data=await quota_service.usage(current_user.id))
\ No newline at end of file
@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
+from datetime import datetime
+import json
 
-from app.database import get_db
-from app.models import ChoiceType, User
+from app.config import settings
+from app.database import get_db, SessionLocal
+from app.models import ChoiceType
 from app.models.responses import (
     SuccessResponse, ErrorResponse,
     ChapterResponse as ChapterResponseModel, STANDARD_RESPONSES,
-    ChapterDetail, ChoicesListResponse, ChoiceDetail
+    ChoicesListResponse, ChoiceDetail, ChaptersBatchResponse, render_success_envelope
 )
 from app.services import StoryService
+from app.utils.auth_cache import CurrentUser
+from app.utils.http_cache import (
+    CACHE_CONTROL_IMMUTABLE, CACHE_CONTROL_REVALIDATE, cache_headers,
+    has_conditional_headers, is_not_modified, not_modified_response,
+    strong_etag, weak_etag
+)
 from .auth import get_current_user
 
 router = APIRouter(prefix="/chapters", tags=["章节"])
@@ -20,46 +30,121 @@ class SubmitChoiceRequest(BaseModel):
     choice_id: Optional[str] = None
     custom_choice: Optional[str] = None
 
+@router.get("",
+           response_model=ChaptersBatchResponse,
+           responses=STANDARD_RESPONSES)
+@router.get("/",
+           response_model=ChaptersBatchResponse,
+           responses=STANDARD_RESPONSES,
+           include_in_schema=False)
+async def get_chapters_batch(
+    ids: str,
+    stream: bool = False,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    批量获取章节详情（ids 以逗号分隔，重复的ID只返回一次）
+
+    两种模式都按 ids 中的顺序返回：
+    - 默认：chapters 为当前用户的章节，其余ID按顺序列入 missing
+    - stream=true：以NDJSON逐行输出，每个ID一行，不存在或无权访问的章节输出 {"id", "error"} 行
+    """
+    chapter_ids = list(dict.fromkeys(chapter_id.strip() for chapter_id in ids.split(",") if chapter_id.strip()))
+    if not chapter_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="请提供章节ID"
+        )
+    if len(chapter_ids) > settings.chapter_batch_limit:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"单次最多获取{settings.chapter_batch_limit}个章节"
+        )
+
+    if stream:
+        user_id = current_user.id
+
+        def ndjson_lines():
+            # 请求级会话在流式响应开始前已关闭，生成器使用独立会话
+            session = SessionLocal()
+            try:
+                for chapter_id, payload in StoryService(session).iter_chapter_payloads(chapter_ids, user_id):
+                    if payload is None:
+                        payload = json.dumps({"id": chapter_id, "error": "章节不存在或无权访问"}, ensure_ascii=False)
+                    yield payload + "\n"
+            finally:
+                session.close()
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    try:
+        payloads = StoryService(db).get_chapter_payloads(chapter_ids, current_user.id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"批量获取章节失败: {str(e)}"
+        )
+
+    # 按请求顺序拼接预渲染的章节JSON，不再逐个校验和重新编码
+    chapters_json = ",".join(payloads[chapter_id] for chapter_id in chapter_ids if chapter_id in payloads)
+    missing = [chapter_id for chapter_id in chapter_ids if chapter_id not in payloads]
+    data_json = '{"chapters":[' + chapters_json + '],"missing":' + json.dumps(missing) + '}'
+    return Response(
+        content=render_success_envelope(data_json),
+        media_type="application/json"
+    )
+
+
 @router.get("/{chapter_id}",
            response_model=ChapterResponseModel,
            responses=STANDARD_RESPONSES)
 async def get_chapter(
     chapter_id: str,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> ChapterResponseModel:
-    """获取章节详情"""
+    """获取章节详情（章节不可变，支持ETag/Last-Modified条件请求）"""
     try:
         story_service = StoryService(db)
-        chapter = story_service.get_chapter(chapter_id)
 
-        if not chapter:
+        # 条件请求：只查询校验字段，未修改时直接返回304
+        if has_conditional_headers(request):
+            validators = story_service.get_chapter_validators(chapter_id)
+            if validators and validators["user_id"] == current_user.id and validators["etag"]:
+                etag = strong_etag(validators["etag"])
+                if is_not_modified(request, etag, validators["created_at"]):
+                    return not_modified_response(
+                        cache_headers(etag, validators["created_at"], CACHE_CONTROL_IMMUTABLE)
+                    )
+
+        chapter_dto = await story_service.get_chapter_dto(chapter_id)
+
+        if not chapter_dto:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="章节不存在"
             )
 
         # 检查用户权限
-        story = story_service.get_story(chapter.story_id)
-        if story and story.user_id != current_user.id:
+        if chapter_dto["user_id"] != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="无权访问此章节"
             )
 
-        # 转换为ChapterDetail模型
-        chapter_detail = ChapterDetail(
-            id=str(chapter.id),
-            story_id=str(chapter.story_id),
-            chapter_number=chapter.chapter_number,
-            title=chapter.title,
-            content=chapter.content,
-            summary=getattr(chapter, 'summary', None),
-            created_at=chapter.created_at
-        )
-
-        return ChapterResponseModel(
-            data=chapter_detail
+        etag = strong_etag(chapter_dto["etag"])
+        created_at = datetime.fromisoformat(chapter_dto["created_at"])
+        headers = cache_headers(etag, created_at, CACHE_CONTROL_IMMUTABLE)
+        if is_not_modified(request, etag, created_at):
+            return not_modified_response(headers)
+
+        # 直接输出写入时预渲染的章节JSON，外层包装为标准响应格式
+        return Response(
+            content=render_success_envelope(chapter_dto["payload"]),
+            media_type="application/json",
+            headers=headers
         )
     except HTTPException:
         raise
@@ -75,30 +160,30 @@ async def get_chapter(
            responses=STANDARD_RESPONSES)
 async def get_chapter_choices(
     chapter_id: str,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> ChoicesListResponse:
     """获取章节的选择选项"""
     try:
         story_service = StoryService(db)
-        chapter = story_service.get_chapter(chapter_id)
+        result = story_service.get_chapter_choices_with_owner(chapter_id)
 
-        if not chapter:
+        if not result:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="章节不存在"
             )
 
         # 检查用户权限
-        story = story_service.get_story(chapter.story_id)
-        if story and story.user_id != current_user.id:
+        owner_id, choices = result
+        if owner_id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="无权访问此章节"
             )
 
-        choices = story_service.get_chapter_choices(chapter_id)
-
         # 转换为ChoiceDetail模型
         choice_details = []
         for choice in choices:
@@ -112,6 +197,13 @@ async def get_chapter_choices(
             )
             choice_details.append(choice_detail)
 
+        # 选择项在用户做出选择后会变化，使用弱ETag并要求重新验证
+        etag = weak_etag(*sorted((choice.id, choice.is_selected) for choice in choices))
+        headers = cache_headers(etag, cache_control=CACHE_CONTROL_REVALIDATE)
+        if is_not_modified(request, etag):
+            return not_modified_response(headers)
+        response.headers.update(headers)
+
         return ChoicesListResponse.create(
             chapter_id=str(chapter_id),
             choices=choice_details
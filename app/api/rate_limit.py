@@ -0,0 +1,82 @@
+"""
+限流依赖
+按路由类别和用户（或客户端IP）限流，放行时写入 RateLimit-* 响应头，超限时返回429
+"""
+
+import ipaddress
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from app.config import settings
+from app.services.rate_limit_service import RateLimitResult, rate_limiter
+from app.utils.auth_cache import CurrentUser
+from .auth import get_current_user
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(proxy, strict=False) for proxy in settings.trusted_proxies)
+
+
+def _client_ip(request: Request) -> str:
+    """
+    客户端IP：默认使用连接的对端地址；仅当对端是可信代理时才读取 X-Forwarded-For，
+    从右向左跳过可信代理，第一个不可信的地址即为客户端（更靠左的值可由客户端任意伪造）
+    """
+    host = request.client.host if request.client else "unknown"
+    if not _is_trusted_proxy(host):
+        return host
+    forwarded = request.headers.get("x-forwarded-for")
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()] if forwarded else []
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else host
+
+
+async def _check(route_class: str, identity: str, response: Response) -> RateLimitResult:
+    result = await rate_limiter.hit(route_class, identity)
+    if not result.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="请求过于频繁，请稍后再试",
+            headers=result.headers
+        )
+    response.headers.update(result.headers)
+    return result
+
+
+async def check_user_rate_limit(route_class: str, user: CurrentUser, response: Response) -> Optional[RateLimitResult]:
+    """在路由内按用户限流，用于只有部分请求需要限流的接口（超限时抛出429）"""
+    if not settings.rate_limit_enabled:
+        return None
+    return await _check(route_class, f"user:{user.id}", response)
+
+
+def rate_limit(route_class: str, by: str = "user"):
+    """
+    创建限流依赖
+
+    Args:
+        route_class: settings.rate_limits 中的路由类别
+        by: "user" 按登录用户限流，"ip" 按客户端IP限流
+
+    返回的结果对象带有 headers，直接返回 Response 的接口（如流式接口）需要自行附加
+    """
+    if by == "ip":
+        async def limit_by_ip(request: Request, response: Response) -> Optional[RateLimitResult]:
+            if not settings.rate_limit_enabled:
+                return None
+            return await _check(route_class, f"ip:{_client_ip(request)}", response)
+        return limit_by_ip
+
+    async def limit_by_user(
+        response: Response,
+        current_user: CurrentUser = Depends(get_current_user)
+    ) -> Optional[RateLimitResult]:
+        return await check_user_rate_limit(route_class, current_user, response)
+    return limit_by_user
@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from pydantic import BaseModel
+from datetime import datetime
+from urllib.parse import quote
 
-from app.database import get_db
-from app.models import StoryStyle, User
+from app.database import get_db, SessionLocal
+from app.models import Story, StoryStyle
 from app.models.responses import (
     SuccessResponse, ErrorResponse, StoriesListResponse,
     StoryDetail, StoryResponse as StoryResponseModel, STANDARD_RESPONSES,
-    ChaptersListResponse, ChapterDetail, StoryChoicesHistoryResponse
+    ChaptersListResponse, ChapterDetail, StoryChoicesHistoryResponse, StoryBundleResponse
 )
 from app.services import StoryService, WorldViewService
+from app.services.export_service import EXPORT_FORMATS, ExportService
+from app.services.story_service import BUNDLE_SECTIONS, delete_story_in_background
+from app.utils.auth_cache import CurrentUser
+from app.utils.exceptions import QuotaExceededException
+from app.utils.http_cache import cache_headers, is_not_modified, not_modified_response, weak_etag
+from app.services.rate_limit_service import RateLimitResult
 from .auth import get_current_user
+from .rate_limit import check_user_rate_limit, rate_limit
 
 router = APIRouter(prefix="/stories", tags=["故事"])
 
@@ -32,7 +42,9 @@ class StoryResponse(BaseModel):
            response_model=StoriesListResponse,
            responses=STANDARD_RESPONSES)
 async def get_all_stories(
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> StoriesListResponse:
     """获取所有故事列表"""
@@ -59,6 +71,14 @@ async def get_all_stories(
             )
             story_details.append(story_detail)
 
+        # 弱ETag：由故事数量、更新时间和章节数派生
+        # 不返回 Last-Modified：删除非最新的故事不会改变最大更新时间，仅凭 If-Modified-Since 会误判为未修改
+        etag = weak_etag(*[(d.id, d.updated_at, d.chapter_count) for d in story_details])
+        headers = cache_headers(etag)
+        if is_not_modified(request, etag):
+            return not_modified_response(headers)
+        response.headers.update(headers)
+
         return StoriesListResponse.create(
             stories=story_details,
             total=len(story_details)
@@ -74,10 +94,14 @@ async def get_all_stories(
             responses=STANDARD_RESPONSES)
 async def create_story(
     request: CreateStoryRequest,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> SuccessResponse:
-    """创建新故事并生成世界观框架"""
+    """创建新故事并生成世界观框架（提供主题时会调用AI生成世界观，按 story_create 限流）"""
+    if request.theme:
+        await check_user_rate_limit("story_create", current_user, response)
+
     try:
         story_service = StoryService(db)
 
@@ -91,7 +115,7 @@ async def create_story(
             )
         else:
             # 兼容旧的创建方式
-            story = story_service.create_story(
+            story = await story_service.create_story(
                 style=request.style,
                 title=request.title,
                 user_id=current_user.id
@@ -101,6 +125,8 @@ async def create_story(
             data=story.to_dict(),
             message="故事创建成功" + ("，世界观已生成" if request.theme else "")
         )
+    except QuotaExceededException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -110,30 +136,40 @@ async def create_story(
 @router.get("/{story_id}", response_model=StoryResponse)
 async def get_story(
     story_id: str,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """获取故事详情"""
     try:
         story_service = StoryService(db)
-        story = story_service.get_story(story_id)
+        story_dto = await story_service.get_story_dto(story_id)
         
-        if not story:
+        if not story_dto:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="故事不存在"
             )
         
         # 检查用户权限
-        if story.user_id != current_user.id:
+        if story_dto["user_id"] != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="无权访问此故事"
             )
         
+        story_data = story_dto["story"]
+        etag = weak_etag(story_data["id"], story_data["updated_at"], story_data["current_chapter_number"])
+        last_modified = datetime.fromisoformat(story_data["updated_at"])
+        headers = cache_headers(etag, last_modified)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(headers)
+        response.headers.update(headers)
+        
         return StoryResponse(
             success=True,
-            data=story.to_dict()
+            data=story_data
         )
     except HTTPException:
         raise
@@ -143,12 +179,67 @@ async def get_story(
             detail=f"获取故事失败: {str(e)}"
         )
 
+@router.get("/{story_id}/bundle",
+           response_model=StoryBundleResponse,
+           responses=STANDARD_RESPONSES)
+async def get_story_bundle(
+    story_id: str,
+    request: Request,
+    response: Response,
+    include: str = ",".join(BUNDLE_SECTIONS),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> StoryBundleResponse:
+    """获取阅读页聚合数据（故事、世界观、章节目录、最新章节及其选择项），一次请求完成加载"""
+    sections = {section.strip() for section in include.split(",") if section.strip()}
+    unknown = sections - set(BUNDLE_SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的include参数: {', '.join(sorted(unknown))}"
+        )
+
+    try:
+        story_service = StoryService(db)
+        bundle = story_service.get_story_bundle(story_id, sections)
+
+        if not bundle:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="故事不存在"
+            )
+
+        # 检查用户权限
+        if bundle["user_id"] != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="无权访问此故事"
+            )
+
+        # 组合ETag：任一部分的版本字段变化都会改变
+        etag = weak_etag(*bundle["validators"])
+        headers = cache_headers(etag)
+        if is_not_modified(request, etag):
+            return not_modified_response(headers)
+        response.headers.update(headers)
+
+        return StoryBundleResponse(data=bundle["data"])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"获取故事聚合数据失败: {str(e)}"
+        )
+
 @router.get("/{story_id}/chapters",
            response_model=ChaptersListResponse,
            responses=STANDARD_RESPONSES)
 async def get_story_chapters(
     story_id: str,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> ChaptersListResponse:
     """获取故事章节列表"""
@@ -185,6 +276,13 @@ async def get_story_chapters(
             )
             chapter_details.append(chapter_detail)
 
+        # 章节只会追加，数量和最新章节即可标识列表版本
+        etag = weak_etag(story_id, len(chapter_details), chapter_details[-1].id if chapter_details else "")
+        headers = cache_headers(etag, story.updated_at)
+        if is_not_modified(request, etag, story.updated_at):
+            return not_modified_response(headers)
+        response.headers.update(headers)
+
         return ChaptersListResponse.create(
             story_id=str(story_id),
             chapters=chapter_details
@@ -201,7 +299,8 @@ async def get_story_chapters(
 @router.post("/{story_id}/chapters/stream")
 async def generate_chapter_stream(
     story_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
+    rate: RateLimitResult = Depends(rate_limit("chapter_generate")),
     db: Session = Depends(get_db)
 ):
     """流式生成新章节（第一章）"""
@@ -247,6 +346,8 @@ async def generate_chapter_stream(
             "Connection": "keep-alive",
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Headers": "*",
+            # 直接返回的Response不会合并依赖注入的响应头，需显式附加
+            **(rate.headers if rate else {}),
         }
     )
 
@@ -255,7 +356,7 @@ async def generate_chapter_stream(
            responses=STANDARD_RESPONSES)
 async def get_story_choices_history(
     story_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> StoryChoicesHistoryResponse:
     """获取故事选择历史"""
@@ -293,10 +394,15 @@ async def get_story_choices_history(
 @router.delete("/{story_id}", response_model=StoryResponse)
 async def delete_story(
     story_id: str,
-    current_user: User = Depends(get_current_user),
+    background_tasks: BackgroundTasks,
+    async_delete: bool = False,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """删除故事及其所有相关数据"""
+    """删除故事及其所有相关数据
+
+    async_delete=true 时立即返回，由后台任务分批删除（适用于章节很多的故事）
+    """
     try:
         story_service = StoryService(db)
         story = story_service.get_story(story_id)
@@ -314,8 +420,16 @@ async def delete_story(
                 detail="无权访问此故事"
             )
         
+        if async_delete:
+            background_tasks.add_task(delete_story_in_background, story_id)
+            return StoryResponse(
+                success=True,
+                data={"story_id": str(story_id)},
+                message="故事删除任务已提交"
+            )
+
         # 删除故事
-        story_service.delete_story(story_id)
+        await story_service.delete_story(story_id)
         
         return StoryResponse(
             success=True,
@@ -336,16 +450,136 @@ async def delete_story(
         )
 
 # 世界观相关API
+def _get_owned_story(story_service: StoryService, story_id: str, user_id: str):
+    """获取故事并校验所属用户"""
+    story = story_service.get_story(story_id)
+    if not story:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="故事不存在"
+        )
+    if story.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="无权访问此故事"
+        )
+    return story
+
+
+def _check_export_format(export_format: str):
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的导出格式: {export_format}，可选: {', '.join(EXPORT_FORMATS)}"
+        )
+
+
+def _attachment_headers(title: str, extension: str) -> Dict[str, str]:
+    return {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(title)}.{extension}"}
+
+
+@router.get("/{story_id}/export")
+async def export_story(
+    story_id: str,
+    format: str = "markdown",
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """流式导出整部故事（markdown / jsonl / epub），内存占用与故事长度无关"""
+    _check_export_format(format)
+    story = _get_owned_story(StoryService(db), story_id, current_user.id)
+    extension, media_type = EXPORT_FORMATS[format]
+    title = story.title
+
+    def export_chunks():
+        # 请求级会话在流式响应开始前已关闭，生成器使用独立会话
+        session = SessionLocal()
+        try:
+            story_row = session.query(Story).filter(Story.id == story_id).first()
+            if story_row:
+                yield from ExportService(session).iter_export(story_row, format)
+        finally:
+            session.close()
+
+    return StreamingResponse(
+        export_chunks(),
+        media_type=media_type,
+        headers=_attachment_headers(title, extension)
+    )
+
+
+@router.post("/{story_id}/exports", response_model=SuccessResponse)
+async def create_export_job(
+    story_id: str,
+    background_tasks: BackgroundTasks,
+    format: str = "epub",
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> SuccessResponse:
+    """创建后台导出任务（适用于超长篇故事），完成后通过下载接口获取文件"""
+    _check_export_format(format)
+    _get_owned_story(StoryService(db), story_id, current_user.id)
+
+    job = ExportService.create_job(story_id, current_user.id, format)
+    # 同步任务由Starlette放到线程池执行，不阻塞事件循环
+    background_tasks.add_task(ExportService.run_job, job)
+    return SuccessResponse(data=job, message="导出任务已创建")
+
+
+def _get_owned_job(story_id: str, job_id: str, user_id: str) -> Dict[str, Any]:
+    job = ExportService.get_job(job_id)
+    if not job or job["story_id"] != story_id or job["user_id"] != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="导出任务不存在"
+        )
+    return job
+
+
+@router.get("/{story_id}/exports/{job_id}", response_model=SuccessResponse)
+async def get_export_job(
+    story_id: str,
+    job_id: str,
+    current_user: CurrentUser = Depends(get_current_user)
+) -> SuccessResponse:
+    """查询后台导出任务状态"""
+    return SuccessResponse(data=_get_owned_job(story_id, job_id, current_user.id))
+
+
+@router.get("/{story_id}/exports/{job_id}/download")
+async def download_export(
+    story_id: str,
+    job_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """下载已完成的导出文件"""
+    job = _get_owned_job(story_id, job_id, current_user.id)
+    if job["status"] != "completed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"导出任务尚未完成: {job['status']}"
+        )
+
+    story = StoryService(db).get_story(story_id)
+    extension, media_type = EXPORT_FORMATS[job["format"]]
+    return FileResponse(
+        ExportService.job_file(job),
+        media_type=media_type,
+        headers=_attachment_headers(story.title if story else job_id, extension)
+    )
+
+
 @router.get("/{story_id}/worldview")
 async def get_story_worldview(
     story_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """获取故事的世界观框架"""
     try:
         worldview_service = WorldViewService(db)
-        worldview = worldview_service.get_worldview(story_id)
+        worldview = await worldview_service.get_worldview_dto(story_id)
         
         if not worldview:
             return {
@@ -356,7 +590,7 @@ async def get_story_worldview(
         
         return {
             "success": True,
-            "data": worldview.to_dict()
+            "data": worldview
         }
     except Exception as e:
         raise HTTPException(
@@ -367,7 +601,7 @@ async def get_story_worldview(
 @router.post("/{story_id}/worldview")
 async def create_worldview(
     story_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """为故事创建世界观框架"""
@@ -391,6 +625,8 @@ async def create_worldview(
             "data": worldview.to_dict(),
             "message": "世界观创建成功"
         }
+    except (HTTPException, QuotaExceededException):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -7,9 +7,11 @@ from .redis_connection import (
     redis_exists, 
     is_redis_connected
 )
+from .redis_async import async_redis
 
 __all__ = [
     "Base", "engine", "get_db", "SessionLocal", "create_tables",
     "get_redis_client", "redis_set", "redis_get", 
-    "redis_delete", "redis_exists", "is_redis_connected"
+    "redis_delete", "redis_exists", "is_redis_connected",
+    "async_redis"
 ]
\ No newline at end of file
@@ -1,9 +1,10 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import OperationalError
 import logging
 from app.config import settings
+from .routing import RoutingSession, ReplicaPool
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -80,17 +81,56 @@ def create_tables():
         # 创建所有表
         logger.info("正在创建数据表...")
         Base.metadata.create_all(bind=engine)
+        upgrade_schema()
         logger.info("数据表创建完成")
         
     except Exception as e:
         logger.error(f"创建数据表时出错: {e}")
         raise
 
+# create_all 只创建缺失的表，不会修改已有的表：模型上后来新增的列在此登记，启动时幂等补齐
+# 新增列须可为空，早期数据由读取路径补算
+ADDED_COLUMNS = [
+    ("chapters", "etag", "VARCHAR(64)"),
+    ("chapters", "payload", "TEXT"),
+]
+
+
+def upgrade_schema():
+    """为已有的表补齐新增的列和索引（已存在时跳过）"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, column_type in ADDED_COLUMNS:
+            existing = {col["name"] for col in inspector.get_columns(table)}
+            if column not in existing:
+                logger.info("为表 %s 添加列 %s", table, column)
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+
+        for table in Base.metadata.sorted_tables:
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    logger.info("为表 %s 创建索引 %s", table.name, index.name)
+                    index.create(bind=conn, checkfirst=True)
+
+
 # 初始化数据库并创建引擎
 engine = init_database()
 
-# 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 只读副本引擎
+replica_engines = [
+    create_engine(url, pool_pre_ping=True, pool_recycle=300)
+    for url in settings.database_replica_urls
+]
+
+# 创建会话工厂（只读查询可路由到副本）
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    replicas=ReplicaPool(replica_engines)
+)
 
 # 依赖注入：获取数据库会话
 def get_db():
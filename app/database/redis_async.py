@@ -0,0 +1,233 @@
+"""
+异步Redis客户端
+基于 redis.asyncio 的连接池客户端，提供批量操作（MGET/MSET/管道）、序列化编解码、
+不阻塞事件循环的超时控制以及连接指标。Redis不可用时所有操作降级为返回默认值。
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+import redis.asyncio as aioredis
+from opentelemetry.trace import Status, StatusCode
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.utils.metrics import REDIS_FAILURES, REDIS_LATENCY
+from app.utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class StringCodec:
+    """原样存取字符串"""
+
+    def encode(self, value: Any) -> str:
+        return value if isinstance(value, str) else str(value)
+
+    def decode(self, raw: str) -> Any:
+        return raw
+
+
+class JSONCodec:
+    """JSON序列化"""
+
+    def encode(self, value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, default=str)
+
+    def decode(self, raw: str) -> Any:
+        return json.loads(raw)
+
+
+CODECS = {
+    "str": StringCodec(),
+    "json": JSONCodec()
+}
+
+
+class RedisMetrics:
+    """Redis命令统计"""
+
+    def __init__(self):
+        self.commands: Dict[str, Dict[str, float]] = {}
+        self.errors = 0
+        self.timeouts = 0
+
+    def record(self, command: str, elapsed: float):
+        stats = self.commands.setdefault(command, {"count": 0, "total_ms": 0.0})
+        stats["count"] += 1
+        stats["total_ms"] += elapsed * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "commands": {
+                name: {
+                    "count": int(stats["count"]),
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 3) if stats["count"] else 0.0
+                }
+                for name, stats in self.commands.items()
+            }
+        }
+
+
+class AsyncRedisClient:
+    """连接池化的异步Redis客户端"""
+
+    def __init__(self, url: str):
+        self.pool = aioredis.ConnectionPool.from_url(
+            url,
+            max_connections=settings.redis_max_connections,
+            socket_connect_timeout=settings.redis_connect_timeout,
+            socket_timeout=settings.redis_socket_timeout,
+            health_check_interval=30,
+            decode_responses=True
+        )
+        self.client = aioredis.Redis(connection_pool=self.pool)
+        self.metrics = RedisMetrics()
+        self._unavailable_until = 0.0
+        self._scripts: Dict[str, Any] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._background: Set[asyncio.Task] = set()
+
+    @property
+    def available(self) -> bool:
+        """最近是否没有发生连接故障"""
+        return time.monotonic() >= self._unavailable_until
+
+    async def _call(self, command: str, factory: Callable[[], Any], default: Any = None) -> Any:
+        """执行命令：统一超时、错误处理、故障退避和指标统计"""
+        if not self.available:
+            return default
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+
+        start = time.perf_counter()
+        with tracer.start_as_current_span(f"redis {command}", attributes={"db.system": "redis"}) as span:
+            try:
+                return await asyncio.wait_for(factory(), timeout=settings.redis_command_timeout)
+            except asyncio.TimeoutError:
+                self.metrics.timeouts += 1
+                REDIS_FAILURES.labels(command, "timeout").inc()
+                span.set_status(Status(StatusCode.ERROR, "timeout"))
+                logger.warning("Redis命令超时: %s", command)
+                self._back_off()
+            except RedisError as e:
+                self.metrics.errors += 1
+                REDIS_FAILURES.labels(command, "error").inc()
+                span.record_exception(e)
+                span.set_status(Status(StatusCode.ERROR, str(e)))
+                logger.warning("Redis命令失败: %s, %s", command, e)
+                if isinstance(e, (aioredis.ConnectionError, aioredis.TimeoutError)):
+                    self._back_off()
+            finally:
+                elapsed = time.perf_counter() - start
+                self.metrics.record(command, elapsed)
+                REDIS_LATENCY.labels(command).observe(elapsed)
+        return default
+
+    def submit(self, factory: Callable[[], Awaitable[Any]]):
+        """
+        在同步代码中提交Redis操作，不等待结果
+        在事件循环线程中创建后台任务；在线程池中（同步路由）提交到客户端所在的事件循环
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            task = loop.create_task(factory())
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        elif self._loop is not None and not self._loop.is_closed():
+            asyncio.run_coroutine_threadsafe(factory(), self._loop)
+
+    def _back_off(self):
+        """连接故障后在一段时间内跳过Redis，避免每个请求都等待超时"""
+        self._unavailable_until = time.monotonic() + settings.redis_retry_backoff_seconds
+
+    async def ping(self) -> bool:
+        return bool(await self._call("PING", self.client.ping, False))
+
+    async def get(self, key: str, codec: str = "str") -> Optional[Any]:
+        raw = await self._call("GET", lambda: self.client.get(key))
+        return None if raw is None else CODECS[codec].decode(raw)
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False,
+                  codec: str = "str") -> bool:
+        encoded = CODECS[codec].encode(value)
+        return bool(await self._call("SET", lambda: self.client.set(key, encoded, ex=ex, nx=nx), False))
+
+    async def delete(self, *keys: str) -> int:
+        if not keys:
+            return 0
+        return await self._call("DEL", lambda: self.client.delete(*keys), 0)
+
+    async def exists(self, key: str) -> bool:
+        return bool(await self._call("EXISTS", lambda: self.client.exists(key), 0))
+
+    async def mget(self, keys: List[str], codec: str = "str") -> List[Optional[Any]]:
+        """批量读取，Redis不可用时返回全为None的列表"""
+        if not keys:
+            return []
+        raws = await self._call("MGET", lambda: self.client.mget(keys), [None] * len(keys))
+        decoder = CODECS[codec]
+        return [None if raw is None else decoder.decode(raw) for raw in raws]
+
+    async def mset(self, mapping: Dict[str, Any], ex: Optional[int] = None, codec: str = "str") -> bool:
+        """批量写入；指定过期时间时通过管道逐个SET"""
+        if not mapping:
+            return True
+        encoder = CODECS[codec]
+        encoded = {key: encoder.encode(value) for key, value in mapping.items()}
+        if ex is None:
+            return bool(await self._call("MSET", lambda: self.client.mset(encoded), False))
+
+        def build(pipe):
+            for key, value in encoded.items():
+                pipe.set(key, value, ex=ex)
+
+        return await self.pipeline(build, command="MSET_EX") is not None
+
+    async def pipeline(self, build: Callable[[Any], None], transaction: bool = False,
+                       command: str = "PIPELINE") -> Optional[List[Any]]:
+        """在一次往返中执行多条命令，build 负责向管道中添加命令"""
+        async def run():
+            async with self.client.pipeline(transaction=transaction) as pipe:
+                build(pipe)
+                return await pipe.execute()
+
+        return await self._call(command, run)
+
+    async def command(self, *args: Any, default: Any = None) -> Any:
+        """执行任意Redis命令"""
+        return await self._call(str(args[0]).upper(), lambda: self.client.execute_command(*args), default)
+
+    async def eval(self, script: str, keys: Iterable[str], args: Iterable[Any], default: Any = None) -> Any:
+        """执行Lua脚本（EVALSHA，未缓存时自动回退EVAL）"""
+        registered = self._scripts.get(script)
+        if registered is None:
+            registered = self._scripts[script] = self.client.register_script(script)
+        return await self._call("EVALSHA", lambda: registered(keys=list(keys), args=list(args)), default)
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池和命令指标"""
+        return {
+            "available": self.available,
+            "pool": {
+                "max_connections": self.pool.max_connections,
+                "in_use": len(getattr(self.pool, "_in_use_connections", ())),
+                "idle": len(getattr(self.pool, "_available_connections", ()))
+            },
+            **self.metrics.to_dict()
+        }
+
+    async def close(self):
+        await self.pool.disconnect()
+
+
+# 全局异步Redis客户端
+async_redis = AsyncRedisClient(settings.redis_url)
@@ -1,5 +1,12 @@
+"""
+同步Redis兼容层
+新代码请使用 app.database.redis_async 中的异步客户端；这里的同步函数仅保留给
+无法使用 await 的场景（如SQLAlchemy事件回调），调用失败时退避一段时间而不是每次重连。
+"""
+
 import redis
 import logging
+import time
 from typing import Optional
 from app.config import settings
 
@@ -11,45 +18,39 @@ class RedisConnection:
     
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
-        self.connect()
+        self._unavailable_until = 0.0
     
     def connect(self):
-        """连接到Redis"""
-        try:
-            # 解析Redis URL
-            self.redis_client = redis.from_url(
-                settings.redis_url,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5,
-                retry_on_timeout=True
-            )
-            
-            # 测试连接
-            self.redis_client.ping()
-            logger.info("Redis连接成功")
-            
-        except redis.ConnectionError as e:
-            logger.error(f"Redis连接失败: {e}")
-            self.redis_client = None
-        except Exception as e:
-            logger.error(f"Redis连接异常: {e}")
-            self.redis_client = None
+        """创建Redis客户端（连接在首次执行命令时建立）"""
+        self.redis_client = redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_connect_timeout=settings.redis_connect_timeout,
+            socket_timeout=settings.redis_socket_timeout
+        )
     
     def get_client(self) -> Optional[redis.Redis]:
-        """获取Redis客户端"""
+        """获取Redis客户端，处于故障退避期时返回None"""
+        if time.monotonic() < self._unavailable_until:
+            return None
         if self.redis_client is None:
             self.connect()
         return self.redis_client
     
+    def _failed(self, action: str, error: Exception):
+        logger.error(f"Redis{action}失败: {error}")
+        if isinstance(error, (redis.ConnectionError, redis.TimeoutError)):
+            self._unavailable_until = time.monotonic() + settings.redis_retry_backoff_seconds
+    
     def is_connected(self) -> bool:
         """检查Redis连接状态"""
         try:
-            if self.redis_client:
-                self.redis_client.ping()
+            client = self.get_client()
+            if client:
+                client.ping()
                 return True
-        except:
-            pass
+        except Exception as e:
+            self._failed("连接检查", e)
         return False
     
     def set(self, key: str, value: str, ex: Optional[int] = None) -> bool:
@@ -60,7 +61,7 @@ class RedisConnection:
                 client.set(key, value, ex=ex)
                 return True
         except Exception as e:
-            logger.error(f"Redis设置失败: {e}")
+            self._failed("设置", e)
         return False
     
     def get(self, key: str) -> Optional[str]:
@@ -70,7 +71,7 @@ class RedisConnection:
             if client:
                 return client.get(key)
         except Exception as e:
-            logger.error(f"Redis获取失败: {e}")
+            self._failed("获取", e)
         return None
     
     def delete(self, key: str) -> bool:
@@ -81,7 +82,7 @@ class RedisConnection:
                 client.delete(key)
                 return True
         except Exception as e:
-            logger.error(f"Redis删除失败: {e}")
+            self._failed("删除", e)
         return False
     
     def exists(self, key: str) -> bool:
@@ -91,7 +92,7 @@ class RedisConnection:
             if client:
                 return bool(client.exists(key))
         except Exception as e:
-            logger.error(f"Redis检查失败: {e}")
+            self._failed("检查", e)
         return False
 
 # 创建全局Redis连接实例
@@ -120,4 +121,4 @@ def redis_exists(key: str) -> bool:
 
 def is_redis_connected() -> bool:
     """检查Redis连接状态"""
-    return redis_connection.is_connected()
\ No newline at end of file
+    return redis_connection.is_connected()
@@ -0,0 +1,185 @@
+"""
+读写分离会话
+只读查询路由到副本库；写入、刷新以及用户写入后的短时间窗口（read-your-writes）内仍走主库，
+副本不可用时自动回退到主库。
+"""
+
+import functools
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.exc import NoInspectionAvailable, OperationalError
+from sqlalchemy.orm import InstanceState, Session
+
+from app.config import settings
+from .redis_async import async_redis
+
+logger = logging.getLogger(__name__)
+
+# 用户最近一次写入后需要读主库的截止时间（进程内）
+_sticky_until: Dict[str, float] = {}
+
+
+def _sticky_enabled(user_id: Optional[str]) -> bool:
+    return bool(user_id) and bool(settings.database_replica_urls) and settings.replica_sticky_seconds > 0
+
+
+def _sticky_key(user_id: str) -> str:
+    return f"db:sticky:{user_id}"
+
+
+def mark_user_write(user_id: str):
+    """记录用户刚刚写入，短时间内的读取固定走主库（在提交钩子中调用，不阻塞）"""
+    if not _sticky_enabled(user_id):
+        return
+    _sticky_until[user_id] = time.monotonic() + settings.replica_sticky_seconds
+
+    # 多进程部署时通过Redis共享粘滞状态（后台写入，不在请求路径上等待）
+    async_redis.submit(lambda: async_redis.set(_sticky_key(user_id), "1", ex=settings.replica_sticky_seconds))
+
+
+def is_user_sticky(user_id: str) -> bool:
+    """用户是否处于写后读主库的时间窗口内（仅查进程内记录，其他进程的记录由 load_sticky_state 预先加载）"""
+    if not user_id:
+        return False
+    deadline = _sticky_until.get(user_id)
+    if deadline is not None:
+        if deadline > time.monotonic():
+            return True
+        _sticky_until.pop(user_id, None)
+    return False
+
+
+async def load_sticky_state(session: Session, user_id: str):
+    """在异步依赖中查询其他进程记录的写后读状态，命中时让会话固定走主库"""
+    if not _sticky_enabled(user_id) or is_user_sticky(user_id):
+        return
+    if await async_redis.exists(_sticky_key(user_id)):
+        pin_primary(session)
+
+
+class ReplicaPool:
+    """只读副本集合，记录故障副本并在冷却时间后重新启用"""
+
+    def __init__(self, engines: List[Engine]):
+        self.engines = engines
+        self._down_until: Dict[Engine, float] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def choose(self) -> Optional[Engine]:
+        """随机选择一个可用副本，没有可用副本时返回None"""
+        now = time.monotonic()
+        available = [e for e in self.engines if self._down_until.get(e, 0) <= now]
+        return random.choice(available) if available else None
+
+    def mark_down(self, engine: Engine):
+        """标记副本不可用"""
+        self._down_until[engine] = time.monotonic() + settings.replica_retry_seconds
+
+
+class RoutingSession(Session):
+    """根据当前读写状态选择主库或副本的会话"""
+
+    def __init__(self, *args, replicas: ReplicaPool = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def choose_replica(self) -> Optional[Engine]:
+        """判断本次读取能否走副本，可以则返回副本引擎"""
+        if not self.replicas or self.info.get("pin_primary"):
+            return None
+        # 会话中有未提交的修改（包括已flush的）时读主库，保证看到自己的写入
+        if self.new or self.dirty or self.deleted or self.info.get("has_writes"):
+            return None
+        # 已在主库上开启事务时继续读主库，同一事务内的读取看到一致的数据
+        if self.in_transaction():
+            return None
+        if is_user_sticky(self.info.get("user_id")):
+            return None
+        return self.replicas.choose()
+
+
+def pin_primary(session: Session):
+    """让会话后续的所有查询都走主库（用于读后写的业务流程）"""
+    session.info["pin_primary"] = True
+
+
+def _attach(session: Session, value: Any) -> Any:
+    """把副本会话查询到的ORM对象并入调用方会话，之后的延迟加载和修改都经由调用方会话（主库）"""
+    if isinstance(value, list):
+        return [_attach(session, item) for item in value]
+    if isinstance(value, tuple) and not isinstance(value, Row):
+        return tuple(_attach(session, item) for item in value)
+    try:
+        state = inspect(value)
+    except NoInspectionAvailable:
+        return value
+    if not isinstance(state, InstanceState):
+        return value
+    existing = session.identity_map.get(state.key)
+    if existing is not None:
+        # 调用方会话中已有的对象优先，不用副本上可能更旧的数据覆盖
+        return existing
+    return session.merge(value, load=False)
+
+
+def read_only(func):
+    """
+    服务方法装饰器：将只读查询路由到副本，副本故障时回退主库重试
+
+    副本查询使用独立的短期会话，不加入调用方会话的事务：副本连接在查询中途断开时，
+    调用方会话不受影响，回退到主库后仍可继续读写和提交。
+    """
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        db = self.db
+        if not isinstance(db, RoutingSession):
+            return func(self, *args, **kwargs)
+
+        engine = db.choose_replica()
+        if engine is None:
+            return func(self, *args, **kwargs)
+
+        replica_session = Session(bind=engine, autoflush=False)
+        self.db = replica_session
+        try:
+            return _attach(db, func(self, *args, **kwargs))
+        except OperationalError as e:
+            logger.warning("只读副本不可用，回退到主库: %s", e)
+            db.replicas.mark_down(engine)
+            self.db = db
+            return func(self, *args, **kwargs)
+        finally:
+            self.db = db
+            replica_session.close()
+
+    return wrapper
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _remember_flush(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _remember_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_sticky_after_commit(session):
+    if session.info.pop("has_writes", False):
+        mark_user_write(session.info.get("user_id"))
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_writes(session):
+    session.info.pop("has_writes", None)
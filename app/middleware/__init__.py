@@ -0,0 +1,11 @@
+from .compression import CompressionMiddleware
+from .metrics import MetricsMiddleware
+from .sql_profiler import SQLProfilerMiddleware
+from .tracing import TracingMiddleware
+
+__all__ = [
+    "CompressionMiddleware",
+    "MetricsMiddleware",
+    "SQLProfilerMiddleware",
+    "TracingMiddleware"
+]
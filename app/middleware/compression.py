@@ -0,0 +1,244 @@
+"""
+响应压缩中间件（纯ASGI实现）
+- 按 Accept-Encoding 协商 br / zstd / gzip（brotli、zstandard 为可选依赖，未安装时跳过）
+- 完整响应体小于阈值时不压缩
+- 流式响应逐块压缩，在SSE事件边界（空行）同步刷新压缩器，保证每个事件立即送达客户端
+"""
+
+import zlib
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 可选依赖
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 可选依赖
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+)
+
+SSE_EVENT_BOUNDARY = b"\n\n"
+
+
+class Compressor(ABC):
+    """统一的流式压缩接口：compress 可能缓冲，flush 输出已缓冲的数据，finish 结束压缩流"""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        ...
+
+    @abstractmethod
+    def flush(self) -> bytes:
+        ...
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        ...
+
+
+class GzipCompressor(Compressor):
+    def __init__(self):
+        self._obj = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor(Compressor):
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=settings.compression_brotli_quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class ZstdCompressor(Compressor):
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=settings.compression_zstd_level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_encodings() -> Dict[str, Callable[[], Compressor]]:
+    """服务端支持的编码，按优先级排列"""
+    encodings: Dict[str, Callable[[], Compressor]] = {}
+    if brotli is not None:
+        encodings["br"] = BrotliCompressor
+    if zstandard is not None:
+        encodings["zstd"] = ZstdCompressor
+    encodings["gzip"] = GzipCompressor
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """按客户端q值选择编码，q值相同时按服务端优先级"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        parts = item.strip().split(";")
+        name = parts[0].strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+
+    best: Optional[Tuple[float, int]] = None
+    chosen = None
+    for rank, name in enumerate(encodings):
+        q = weights.get(name, weights.get("*", 0.0))
+        if q <= 0:
+            continue
+        key = (q, -rank)
+        if best is None or key > best:
+            best, chosen = key, name
+    return chosen
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 500):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), list(self.encodings)
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.encodings[encoding], self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """包装 send：缓存响应头，根据第一个响应体消息决定整体压缩还是流式压缩"""
+
+    def __init__(self, send: Send, encoding: str, factory: Callable[[], Compressor], minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.factory = factory
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[Compressor] = None
+        self.passthrough = False
+        self.event_stream = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                message["status"] < 200
+                or message["status"] in (204, 304)
+                or "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            self.event_stream = content_type.startswith("text/event-stream")
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body:
+                await self._send_whole(body)
+                return
+            # 流式响应：长度未知，改为分块传输
+            self.compressor = self.factory()
+            headers = self._compressed_headers()
+            del headers["content-length"]
+            await self._flush_start()
+
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.finish()
+        elif self.event_stream or body.endswith(SSE_EVENT_BOUNDARY):
+            # SSE事件边界：立即输出压缩器缓冲，避免事件被压缩器扣留
+            data += self.compressor.flush()
+        if data or not more_body:
+            await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    async def _send_whole(self, body: bytes) -> None:
+        if len(body) < self.minimum_size:
+            MutableHeaders(raw=self.start_message["headers"]).add_vary_header("Accept-Encoding")
+            await self._flush_start()
+            await self._send({"type": "http.response.body", "body": body})
+            return
+
+        compressor = self.factory()
+        data = compressor.compress(body) + compressor.finish()
+        headers = self._compressed_headers()
+        headers["content-length"] = str(len(data))
+        await self._flush_start()
+        await self._send({"type": "http.response.body", "body": data})
+
+    def _compressed_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # 压缩后字节不同，强ETag降级为弱ETag（条件请求使用弱比较）
+        etag = headers.get("etag")
+        if etag and etag.startswith('"'):
+            headers["etag"] = "W/" + etag
+        return headers
+
+    async def _flush_start(self) -> None:
+        if self.start_message is not None:
+            await self._send(self.start_message)
+            self.start_message = None
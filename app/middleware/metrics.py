@@ -0,0 +1,55 @@
+"""
+HTTP指标中间件（纯ASGI实现）
+路由模板取自路由匹配后的 scope["route"]，未匹配的请求统一记为 "unmatched"，避免原始ID造成标签爆炸
+"""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics import (
+    HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS, STREAM_DURATION, STREAMS_ACTIVE
+)
+
+
+def _route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start = time.perf_counter()
+        status_code = 500
+        stream_started = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, stream_started
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                HTTP_LATENCY.labels(method, _route_template(scope)).observe(time.perf_counter() - start)
+            elif message["type"] == "http.response.body":
+                more_body = message.get("more_body", False)
+                if more_body and stream_started is None:
+                    stream_started = time.perf_counter()
+                    STREAMS_ACTIVE.labels(_route_template(scope)).inc()
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = _route_template(scope)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            if stream_started is not None:
+                STREAMS_ACTIVE.labels(route).dec()
+                STREAM_DURATION.labels(route).observe(time.perf_counter() - stream_started)
@@ -0,0 +1,55 @@
+"""
+SQL分析中间件（纯ASGI实现）
+- 每个请求单独统计SQL语句，响应头返回 Server-Timing 和 X-DB-Queries（统计到响应头发出为止）
+- 请求结束（含流式响应）后，语句数或耗时超过阈值时记录日志并附带最慢的语句
+- 调试模式下同一语句形状重复超过阈值时告警（N+1检测）
+"""
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.sql_profiler import profile_queries
+
+logger = get_logger(__name__)
+
+
+class SQLProfilerMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with profile_queries() as profile:
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and settings.sql_profiler_headers:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", profile.server_timing())
+                    headers["X-DB-Queries"] = str(profile.count)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self._report(scope, profile)
+
+    @staticmethod
+    def _report(scope: Scope, profile) -> None:
+        if profile.count == 0:
+            return
+        route = getattr(scope.get("route"), "path", None) or scope["path"]
+        request = f"{scope['method']} {route}"
+
+        if (profile.count > settings.sql_profiler_max_queries
+                or profile.total_time * 1000 > settings.sql_profiler_slow_ms):
+            logger.warning("SQL开销过高: {}, {}", request, profile.summary())
+        else:
+            logger.debug("SQL统计: {}, {} 条, {:.1f}ms", request, profile.count, profile.total_time * 1000)
+
+        if settings.debug:
+            for shape, count in profile.repeated_shapes(settings.sql_n_plus_one_threshold).items():
+                logger.warning("疑似N+1查询: {} 中同一语句执行了 {} 次: {}", request, count, shape)
@@ -0,0 +1,48 @@
+"""
+追踪中间件（纯ASGI实现）
+为每个HTTP请求创建服务端span，从请求头提取上游的 traceparent，并在响应头返回 X-Trace-Id；
+span名在路由匹配后更新为路由模板，流式响应的span持续到最后一个数据块发送完毕
+"""
+
+from opentelemetry import propagate, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.tracing import tracer
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        method = scope["method"]
+
+        with tracer.start_as_current_span(
+            f"HTTP {method}",
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.method": method, "http.target": scope["path"]}
+        ) as span:
+            trace_id = trace.format_trace_id(span.get_span_context().trace_id)
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    route = getattr(scope.get("route"), "path", None)
+                    if route:
+                        span.update_name(f"HTTP {method} {route}")
+                        span.set_attribute("http.route", route)
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                    if span.is_recording():
+                        MutableHeaders(scope=message)["X-Trace-Id"] = trace_id
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
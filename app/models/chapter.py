@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Index
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from datetime import datetime
 import uuid
@@ -7,6 +7,10 @@ from ..database.connection import Base
 
 class Chapter(Base):
     __tablename__ = "chapters"
+    __table_args__ = (
+        # 按故事读取最近章节（摘要窗口、最新章节）时使用
+        Index("ix_chapters_story_id_chapter_number", "story_id", "chapter_number"),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
     story_id = Column(String(36), ForeignKey("stories.id"), nullable=False, index=True)
@@ -14,6 +18,8 @@ class Chapter(Base):
     title = Column(String(255), nullable=False)
     content = Column(Text, nullable=False)
     summary = Column(Text)
+    etag = Column(String(64))  # 内容摘要，写入时计算，用作HTTP强ETag
+    payload = deferred(Column(Text))  # 预渲染的章节详情JSON，读取接口直接输出
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # 关联关系
@@ -6,6 +6,7 @@
 from typing import Any, Dict, List, Optional, Union
 from pydantic import BaseModel, Field
 from datetime import datetime
+import json
 
 
 class BaseAPIResponse(BaseModel):
@@ -19,12 +20,14 @@ class BaseAPIResponse(BaseModel):
             datetime: lambda v: v.isoformat()
         }
 
-    def model_dump(self, **kwargs):
-        """重写model_dump以处理datetime序列化"""
-        data = super().model_dump(**kwargs)
-        if 'timestamp' in data and isinstance(data['timestamp'], datetime):
-            data['timestamp'] = data['timestamp'].isoformat()
-        return data
+
+def render_success_envelope(data_json: str, message: Optional[str] = None) -> bytes:
+    """将已序列化的data拼装为SuccessResponse格式的JSON，不再对data做校验和重新编码"""
+    return (
+        '{"success":true,"message":' + json.dumps(message, ensure_ascii=False)
+        + ',"timestamp":"' + datetime.now().isoformat()
+        + '","data":' + data_json + '}'
+    ).encode("utf-8")
 
 
 class SuccessResponse(BaseAPIResponse):
@@ -100,25 +103,28 @@ class StoryResponse(BaseModel):
         }
 
 
+class StoriesListData(BaseModel):
+    """故事列表数据"""
+    stories: List[StoryDetail] = Field(default_factory=list)
+    total: int = 0
+    page: int = 1
+    page_size: int = 20
+
+
 class StoriesListResponse(SuccessResponse):
     """故事列表响应"""
-    data: Dict[str, Any] = Field(default_factory=lambda: {
-        "stories": [],
-        "total": 0,
-        "page": 1,
-        "page_size": 20
-    })
+    data: StoriesListData = Field(default_factory=StoriesListData)
 
     @classmethod
     def create(cls, stories: List[StoryDetail], total: int, page: int = 1, page_size: int = 20, **kwargs):
         """创建故事列表响应"""
         return cls(
-            data={
-                "stories": [story.dict() for story in stories],
-                "total": total,
-                "page": page,
-                "page_size": page_size
-            },
+            data=StoriesListData(
+                stories=stories,
+                total=total,
+                page=page,
+                page_size=page_size
+            ),
             message="获取故事列表成功",
             **kwargs
         )
@@ -145,26 +151,60 @@ class ChapterResponse(SuccessResponse):
     data: ChapterDetail
 
 
+class ChaptersListData(BaseModel):
+    """章节列表数据"""
+    story_id: str = ""
+    chapters: List[ChapterDetail] = Field(default_factory=list)
+
+
 class ChaptersListResponse(SuccessResponse):
     """章节列表响应模型"""
-    data: Dict[str, Any] = Field(default_factory=lambda: {
-        "story_id": "",
-        "chapters": []
-    })
+    data: ChaptersListData = Field(default_factory=ChaptersListData)
 
     @classmethod
     def create(cls, story_id: str, chapters: List[ChapterDetail], **kwargs):
         """创建章节列表响应"""
         return cls(
-            data={
-                "story_id": story_id,
-                "chapters": [chapter.dict() for chapter in chapters]
-            },
+            data=ChaptersListData(story_id=story_id, chapters=chapters),
             message="获取章节列表成功",
             **kwargs
         )
 
 
+class ChaptersBatchData(BaseModel):
+    """批量章节数据"""
+    chapters: List[ChapterDetail] = Field(default_factory=list)
+    missing: List[str] = Field(default_factory=list)  # 不存在或无权访问的章节ID
+
+
+class ChaptersBatchResponse(SuccessResponse):
+    """批量章节响应模型"""
+    data: ChaptersBatchData = Field(default_factory=ChaptersBatchData)
+
+
+class ChapterIndexItem(BaseModel):
+    """章节目录项（不含正文）"""
+    id: str
+    chapter_number: int
+    title: str
+    summary: Optional[str] = None
+    created_at: datetime
+
+
+class StoryBundleData(BaseModel):
+    """故事聚合数据：未请求的部分为None"""
+    story: Dict[str, Any]
+    worldview: Optional[Dict[str, Any]] = None
+    chapters: Optional[List[ChapterIndexItem]] = None
+    latest_chapter: Optional[ChapterDetail] = None
+    choices: Optional[List[Dict[str, Any]]] = None
+
+
+class StoryBundleResponse(SuccessResponse):
+    """故事聚合响应模型"""
+    data: StoryBundleData
+
+
 class ChoiceDetail(BaseModel):
     """选择项详情模型"""
     id: str
@@ -180,41 +220,41 @@ class ChoiceDetail(BaseModel):
         }
 
 
+class ChoicesListData(BaseModel):
+    """选择列表数据"""
+    chapter_id: str = ""
+    choices: List[ChoiceDetail] = Field(default_factory=list)
+
+
 class ChoicesListResponse(SuccessResponse):
     """选择列表响应模型"""
-    data: Dict[str, Any] = Field(default_factory=lambda: {
-        "chapter_id": "",
-        "choices": []
-    })
+    data: ChoicesListData = Field(default_factory=ChoicesListData)
 
     @classmethod
     def create(cls, chapter_id: str, choices: List[ChoiceDetail], **kwargs):
         """创建选择列表响应"""
         return cls(
-            data={
-                "chapter_id": chapter_id,
-                "choices": [choice.dict() for choice in choices]
-            },
+            data=ChoicesListData(chapter_id=chapter_id, choices=choices),
             message="获取选择列表成功",
             **kwargs
         )
 
 
+class StoryChoicesHistoryData(BaseModel):
+    """故事选择历史数据"""
+    story_id: str = ""
+    choices_history: List[Dict[str, Any]] = Field(default_factory=list)
+
+
 class StoryChoicesHistoryResponse(SuccessResponse):
     """故事选择历史响应模型"""
-    data: Dict[str, Any] = Field(default_factory=lambda: {
-        "story_id": "",
-        "choices_history": []
-    })
+    data: StoryChoicesHistoryData = Field(default_factory=StoryChoicesHistoryData)
 
     @classmethod
     def create(cls, story_id: str, choices_history: List[Dict], **kwargs):
         """创建故事选择历史响应"""
         return cls(
-            data={
-                "story_id": story_id,
-                "choices_history": choices_history
-            },
+            data=StoryChoicesHistoryData(story_id=story_id, choices_history=choices_history),
             message="获取选择历史成功",
             **kwargs
         )
@@ -253,6 +293,9 @@ class HealthCheckResponse(BaseModel):
     status: str
     version: str
     services: Dict[str, str]
+    checked_at: Optional[datetime] = None  # 依赖检查结果的时间（后台定期检查）
+    cache: Optional[Dict[str, Any]] = None  # 按实体类型统计的缓存命中率
+    redis: Optional[Dict[str, Any]] = None  # Redis连接池和命令指标
 
     class Config:
         schema_extra = {
@@ -267,6 +310,12 @@ class HealthCheckResponse(BaseModel):
         }
 
 
+class ProbeResponse(BaseModel):
+    """存活/就绪探针响应模型"""
+    status: str
+    checked_at: Optional[datetime] = None
+
+
 class RootResponse(BaseModel):
     """根路径响应模型"""
     message: str
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, String, DateTime, Integer, Text, Enum, JSON, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from datetime import datetime
 import uuid
@@ -30,7 +30,8 @@ class Story(Base):
     
     # 故事状态数据（JSON格式存储）
     state_data = Column(JSON, default=dict)
-    chapter_summaries = Column(JSON, default=list)
+    # 已废弃：章节摘要改为存储在 Chapter.summary 中，延迟加载避免每次查询故事都读取整个列表
+    chapter_summaries = deferred(Column(JSON, default=list))
     character_info = Column(JSON, default=dict)
     
     # 关联关系
@@ -5,9 +5,12 @@ import re
 from app.config import settings
 from app.models import StoryStyle
 from app.utils.logger import get_logger
+from app.utils.tracing import trace_class
+from app.utils.metrics import llm_call, llm_stream
 
 logger = get_logger(__name__)
 
+@trace_class
 class AIService:
     def __init__(self):
         if settings.gemini_api_key:
@@ -58,7 +61,8 @@ class AIService:
         # 添加章节摘要
         if story_data.get('chapter_summaries'):
             context += "\n之前的故事情节：\n"
-            for i, summary in enumerate(story_data['chapter_summaries'], 1):
+            start = story_data.get('chapter_summaries_start', 1)
+            for i, summary in enumerate(story_data['chapter_summaries'], start):
                 context += f"第{i}章：{summary}\n"
         
         # 添加角色信息
@@ -73,9 +77,10 @@ class AIService:
         
         return context
     
+    @llm_call("worldview")
     async def generate_worldview(self, story_title: str, story_style: StoryStyle, story_theme: str = None) -> Dict[str, Any]:
         """生成世界观框架"""
-        logger.info(f"开始生成世界观 - 标题: {story_title}, 风格: {story_style.value}")
+        logger.info("开始生成世界观 - 标题: {}, 风格: {}", story_title, story_style.value)
 
         # 检查Gemini API配置
         if not self.model:
@@ -193,9 +198,13 @@ class AIService:
             raise Exception(f"Gemini API调用失败: {str(e)}")
     
 
+    @llm_stream("chapter")
     async def generate_chapter_stream(self, story_data: Dict[str, Any], worldview_context: str = None, previous_choice: str = None):
         """流式生成章节内容"""
-        logger.info(f"开始流式生成章节 - 故事: {story_data.get('title', 'Unknown')}, 章节: {story_data.get('current_chapter_number', 1)}")
+        logger.info(
+            "开始流式生成章节 - 故事: {}, 章节: {}",
+            story_data.get('title', 'Unknown'), story_data.get('current_chapter_number', 1)
+        )
 
         # 检查Gemini API配置
         if not self.model:
@@ -260,9 +269,10 @@ class AIService:
                 "message": f"Gemini API调用失败: {str(e)}"
             }
     
+    @llm_call("choices")
     async def generate_choices(self, chapter_content: str, story_style: StoryStyle) -> List[str]:
         """生成选择选项"""
-        logger.info(f"开始生成选择选项 - 风格: {story_style.value}")
+        logger.info("开始生成选择选项 - 风格: {}", story_style.value)
 
         # 检查Gemini API配置
         if not self.model:
@@ -0,0 +1,292 @@
+"""
+DTO读穿缓存
+将故事、章节、世界观的序列化结果缓存到Redis，写操作时显式失效，
+并按实体类型统计命中率和耗时。
+
+为避免热点键过期时的缓存击穿，读取时结合了：
+- 每个键的分布式锁：同一时间只有一个请求回源，其余请求等待结果
+- 概率提前过期（XFetch）：临近过期时按回源耗时随机提前刷新
+- 过期后在宽限期内返回旧值，同时在后台刷新（stale-while-revalidate）
+
+每个键另有一个版本号，失效和主动写入时递增；回源前读取版本号，写回时版本号已变化则放弃写入，
+避免失效之前开始的回源在失效之后把旧数据写回缓存。
+"""
+
+import asyncio
+import functools
+import math
+import random
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.config import settings
+from app.database import async_redis, SessionLocal
+from app.database.redis_async import CODECS
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 仅当锁仍由自己持有时才释放
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# KEYS[1]: 缓存键, KEYS[2]: 版本键; ARGV: 回源前读取的版本号, 缓存值, 过期秒数
+# 版本号未变化时写入并返回1，期间发生过失效则返回0
+STORE_IF_VERSION_SCRIPT = """
+if (redis.call('get', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+# 版本键的过期时间，只需长于进行中的回源（过期后版本号回到0，进行中的写回同样会被放弃）
+VERSION_TTL = 3600
+
+
+class CacheStats:
+    """单个实体类型的缓存统计"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.hit_time = 0.0
+        self.miss_time = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "background_refreshes": self.refreshes,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "avg_hit_ms": round(self.hit_time / self.hits * 1000, 3) if self.hits else 0.0,
+            "avg_miss_ms": round(self.miss_time / self.misses * 1000, 3) if self.misses else 0.0
+        }
+
+
+class DTOCache:
+    """基于Redis的DTO缓存，缓存值包装为 {"v": 数据, "exp": 逻辑过期时间, "delta": 回源耗时}"""
+
+    def __init__(self, prefix: str = "cache"):
+        self.prefix = prefix
+        self._stats: Dict[str, CacheStats] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def _key(self, entity: str, entity_id: str) -> str:
+        return f"{self.prefix}:{entity}:{entity_id}"
+
+    @staticmethod
+    def _version_key(key: str) -> str:
+        return f"ver:{key}"
+
+    def _stats_for(self, entity: str) -> CacheStats:
+        return self._stats.setdefault(entity, CacheStats())
+
+    def _record(self, entity: str, hit: bool, elapsed: float):
+        stats = self._stats_for(entity)
+        if hit:
+            stats.hits += 1
+            stats.hit_time += elapsed
+        else:
+            stats.misses += 1
+            stats.miss_time += elapsed
+
+    async def _store(self, key: str, value: Dict[str, Any], ttl: int, version: str, delta: float = 0.0) -> bool:
+        """版本号与回源前一致时写入缓存，返回是否写入"""
+        entry = {"v": value, "exp": time.time() + ttl, "delta": delta, "ver": version}
+        # 物理过期时间多出宽限期，用于过期后返回旧值
+        stored = await async_redis.eval(
+            STORE_IF_VERSION_SCRIPT,
+            [key, self._version_key(key)],
+            [version, CODECS["json"].encode(entry), ttl + settings.cache_stale_seconds]
+        )
+        if stored == 0:
+            logger.debug("回源期间缓存已失效，放弃写入: {}", key)
+        return bool(stored)
+
+    async def _bump_versions(self, keys: List[str]) -> Optional[List[Any]]:
+        """删除缓存并递增版本号，返回管道结果（每个键依次为 DEL、INCR、EXPIRE 的结果）"""
+        def build(pipe):
+            for key in keys:
+                pipe.delete(key)
+                pipe.incr(self._version_key(key))
+                pipe.expire(self._version_key(key), VERSION_TTL)
+
+        return await async_redis.pipeline(build, transaction=True, command="CACHE_INVALIDATE")
+
+    async def _acquire_lock(self, key: str) -> Optional[str]:
+        token = uuid.uuid4().hex
+        acquired = await async_redis.set(f"lock:{key}", token, ex=settings.cache_lock_seconds, nx=True)
+        return token if acquired else None
+
+    async def _release_lock(self, key: str, token: str):
+        await async_redis.eval(RELEASE_LOCK_SCRIPT, [f"lock:{key}"], [token])
+
+    @staticmethod
+    def _should_refresh_early(entry: Dict[str, Any], now: float) -> bool:
+        """XFetch：回源越慢、越接近过期，越可能提前刷新"""
+        delta = entry.get("delta") or 0.0
+        if delta <= 0:
+            return False
+        return now - delta * settings.cache_early_expiration_beta * math.log(random.random()) >= entry["exp"]
+
+    async def _load_and_store(self, key: str, loader: Callable[[], Optional[Dict[str, Any]]], ttl: int, version: str):
+        start = time.perf_counter()
+        value = loader()
+        if value is not None:
+            await self._store(key, value, ttl, version, time.perf_counter() - start)
+        return value
+
+    def _refresh_in_background(self, entity: str, key: str, refresher: Callable[[], Optional[Dict[str, Any]]],
+                               ttl: int, version: str):
+        """获得锁后在后台线程中回源刷新，不阻塞当前请求"""
+        async def run():
+            token = await self._acquire_lock(key)
+            if not token:
+                return
+            try:
+                start = time.perf_counter()
+                value = await asyncio.to_thread(refresher)
+                if value is not None:
+                    await self._store(key, value, ttl, version, time.perf_counter() - start)
+                self._stats_for(entity).refreshes += 1
+            except Exception as e:
+                logger.warning("后台刷新缓存失败: {}, {}", key, e)
+            finally:
+                await self._release_lock(key, token)
+
+        task = asyncio.create_task(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def get_or_load(
+        self,
+        entity: str,
+        entity_id: str,
+        loader: Callable[[], Optional[Dict[str, Any]]],
+        ttl: int,
+        refresher: Callable[[], Optional[Dict[str, Any]]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """读取缓存，未命中时加锁回源并写回缓存（不缓存None）
+
+        loader 在当前请求中同步回源；refresher 用于后台刷新，必须自行管理数据库会话，
+        未提供时临近过期或过期的数据按未命中处理。
+        """
+        if not settings.cache_enabled:
+            return loader()
+
+        start = time.perf_counter()
+        key = self._key(entity, str(entity_id))
+
+        raw, version = await async_redis.mget([key, self._version_key(key)])
+        version = version or "0"
+        entry = None
+        if raw is not None:
+            try:
+                entry = CODECS["json"].decode(raw)
+            except ValueError:
+                logger.warning("缓存数据损坏，已忽略: {}", key)
+
+        if entry is not None and refresher is not None:
+            now = time.time()
+            if now >= entry["exp"]:
+                self._stats_for(entity).stale_hits += 1
+                self._refresh_in_background(entity, key, refresher, ttl, version)
+            elif self._should_refresh_early(entry, now):
+                self._refresh_in_background(entity, key, refresher, ttl, version)
+            self._record(entity, True, time.perf_counter() - start)
+            return entry["v"]
+
+        if entry is not None and time.time() < entry["exp"]:
+            self._record(entity, True, time.perf_counter() - start)
+            return entry["v"]
+
+        value = await self._load_with_lock(key, loader, ttl, version)
+        self._record(entity, False, time.perf_counter() - start)
+        return value
+
+    async def _load_with_lock(self, key: str, loader: Callable[[], Optional[Dict[str, Any]]], ttl: int, version: str):
+        """只允许一个请求回源，其余请求短暂等待其写入的结果"""
+        if not async_redis.available:
+            return loader()
+
+        token = await self._acquire_lock(key)
+        if token:
+            try:
+                return await self._load_and_store(key, loader, ttl, version)
+            finally:
+                await self._release_lock(key, token)
+
+        deadline = time.monotonic() + settings.cache_lock_wait_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            raw, lock = await async_redis.mget([key, f"lock:{key}"])
+            if raw is not None:
+                return CODECS["json"].decode(raw)["v"]
+            if lock is None:
+                # 持锁请求已结束但没有写入缓存（数据不存在或回源失败）
+                break
+
+        # 等待超时或持锁请求未产生结果，自行回源
+        return await self._load_and_store(key, loader, ttl, version)
+
+    async def put(self, entity: str, entity_id: str, value: Dict[str, Any], ttl: int):
+        """主动写入缓存（数据写入时预热），同时使进行中的回源失效"""
+        if not settings.cache_enabled:
+            return
+        key = self._key(entity, str(entity_id))
+        result = await self._bump_versions([key])
+        if result is not None:
+            await self._store(key, value, ttl, str(result[1]))
+
+    async def invalidate(self, entity: str, *entity_ids: str):
+        """使指定实体的缓存失效，进行中的回源不会再把旧数据写回"""
+        if entity_ids:
+            await self._bump_versions([self._key(entity, str(entity_id)) for entity_id in entity_ids])
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """按实体类型返回命中率和平均耗时"""
+        return {entity: stats.to_dict() for entity, stats in self._stats.items()}
+
+
+# 全局缓存实例
+dto_cache = DTOCache()
+
+
+def cached(entity: str, ttl: Callable[[], int]):
+    """服务方法缓存装饰器
+
+    被装饰的方法是同步回源函数（第一个参数作为缓存键），装饰后变为异步方法。
+    后台刷新时使用独立的数据库会话重新构造服务实例，不占用请求的会话。
+    服务类需要以 Service(db) 的方式构造。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, entity_id, *args, **kwargs):
+            def refresher():
+                db = SessionLocal()
+                try:
+                    return func(type(self)(db), entity_id, *args, **kwargs)
+                finally:
+                    db.close()
+
+            return await dto_cache.get_or_load(
+                entity,
+                entity_id,
+                lambda: func(self, entity_id, *args, **kwargs),
+                ttl(),
+                refresher
+            )
+
+        return wrapper
+
+    return decorator
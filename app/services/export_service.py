@@ -0,0 +1,259 @@
+"""
+故事导出服务
+将整部故事导出为 Markdown、JSONL 或 EPUB：
+- 章节通过 yield_per 分批读取，边读边输出，内存占用与故事长度无关
+- EPUB 由 zipfile 直接写入不可回溯的流式缓冲区，逐章产出压缩数据
+- 长篇故事可作为后台任务导出到文件，完成后下载
+"""
+
+import html
+import io
+import json
+import os
+import uuid
+import zipfile
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Chapter, Story
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+EXPORT_FORMATS = {
+    "markdown": ("md", "text/markdown; charset=utf-8"),
+    "jsonl": ("jsonl", "application/x-ndjson"),
+    "epub": ("epub", "application/epub+zip"),
+}
+
+
+class _StreamBuffer(io.RawIOBase):
+    """只写、不可回溯的缓冲区：zipfile 写入后由调用方取走已写出的字节"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # zipfile 需要知道当前偏移来记录中央目录，但不会回溯
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ExportService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def iter_chapters(self, story_id: str) -> Iterator[Any]:
+        """按章节顺序分批读取章节（服务端游标，不一次性加载全部正文）"""
+        query = self.db.query(
+            Chapter.chapter_number, Chapter.title, Chapter.content, Chapter.summary, Chapter.created_at
+        ).filter(Chapter.story_id == story_id).order_by(Chapter.chapter_number)
+        return query.yield_per(settings.export_yield_per)
+
+    def iter_export(self, story: Story, export_format: str) -> Iterator[bytes]:
+        """按格式逐块产出导出内容"""
+        renderers = {
+            "markdown": self._iter_markdown,
+            "jsonl": self._iter_jsonl,
+            "epub": self._iter_epub,
+        }
+        return renderers[export_format](story)
+
+    def _iter_markdown(self, story: Story) -> Iterator[bytes]:
+        yield f"# {story.title}\n".encode("utf-8")
+        for chapter in self.iter_chapters(story.id):
+            yield f"\n## 第{chapter.chapter_number}章 {chapter.title}\n\n{chapter.content}\n".encode("utf-8")
+
+    def _iter_jsonl(self, story: Story) -> Iterator[bytes]:
+        yield self._json_line({"type": "story", **story.to_dict()})
+        for chapter in self.iter_chapters(story.id):
+            yield self._json_line({
+                "type": "chapter",
+                "chapter_number": chapter.chapter_number,
+                "title": chapter.title,
+                "content": chapter.content,
+                "summary": chapter.summary,
+                "created_at": chapter.created_at.isoformat()
+            })
+
+    @staticmethod
+    def _json_line(data: Dict[str, Any]) -> bytes:
+        return (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _iter_epub(self, story: Story) -> Iterator[bytes]:
+        buffer = _StreamBuffer()
+        toc: List[Tuple[str, str]] = []
+        book_id = f"urn:uuid:{story.id}"
+
+        with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+            archive.writestr("META-INF/container.xml", CONTAINER_XML)
+            yield buffer.drain()
+
+            for chapter in self.iter_chapters(story.id):
+                name = f"chapter-{chapter.chapter_number:05d}.xhtml"
+                title = f"第{chapter.chapter_number}章 {chapter.title}"
+                archive.writestr(f"OEBPS/{name}", _chapter_xhtml(title, chapter.content))
+                toc.append((name, title))
+                yield buffer.drain()
+
+            # 目录和清单只含文件名与标题，写在最后（EPUB不要求条目顺序，仅 mimetype 必须第一个）
+            archive.writestr("OEBPS/nav.xhtml", _nav_xhtml(story.title, toc))
+            archive.writestr("OEBPS/content.opf", _content_opf(book_id, story.title, toc))
+        yield buffer.drain()
+
+    # 后台导出任务：导出文件和任务元数据写入 settings.export_dir，多进程共享
+
+    @staticmethod
+    def _job_path(job_id: str, suffix: str) -> str:
+        return os.path.join(settings.export_dir, f"{job_id}.{suffix}")
+
+    @classmethod
+    def create_job(cls, story_id: str, user_id: str, export_format: str) -> Dict[str, Any]:
+        """登记后台导出任务"""
+        os.makedirs(settings.export_dir, exist_ok=True)
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "story_id": story_id,
+            "user_id": user_id,
+            "format": export_format,
+            "status": "pending",
+            "created_at": datetime.utcnow().isoformat()
+        }
+        cls._save_job(job)
+        return job
+
+    @classmethod
+    def _save_job(cls, job: Dict[str, Any]):
+        path = cls._job_path(job["job_id"], "json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def get_job(cls, job_id: str) -> Optional[Dict[str, Any]]:
+        """读取任务状态，任务不存在时返回None"""
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(cls._job_path(job_id, "json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def job_file(cls, job: Dict[str, Any]) -> str:
+        return cls._job_path(job["job_id"], EXPORT_FORMATS[job["format"]][0])
+
+    @classmethod
+    def run_job(cls, job: Dict[str, Any]):
+        """执行导出任务（在后台线程中运行，使用独立会话）"""
+        target = cls.job_file(job)
+        session = SessionLocal()
+        try:
+            job["status"] = "running"
+            cls._save_job(job)
+
+            story = session.query(Story).filter(Story.id == job["story_id"]).first()
+            if not story:
+                raise ValueError("故事不存在")
+
+            with open(target + ".part", "wb") as f:
+                for chunk in cls(session).iter_export(story, job["format"]):
+                    f.write(chunk)
+            os.replace(target + ".part", target)
+
+            job["status"] = "completed"
+            job["size"] = os.path.getsize(target)
+        except Exception as e:
+            logger.error(f"导出任务失败: {job['job_id']}, {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+            if os.path.exists(target + ".part"):
+                os.remove(target + ".part")
+        finally:
+            session.close()
+            job["finished_at"] = datetime.utcnow().isoformat()
+            cls._save_job(job)
+
+
+CONTAINER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+
+def _chapter_xhtml(title: str, content: str) -> str:
+    paragraphs = "\n".join(
+        f"<p>{html.escape(line.strip())}</p>" for line in content.splitlines() if line.strip()
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="zh-CN">
+<head><title>{html.escape(title)}</title></head>
+<body>
+<h2>{html.escape(title)}</h2>
+{paragraphs}
+</body>
+</html>
+"""
+
+
+def _nav_xhtml(book_title: str, toc: List[Tuple[str, str]]) -> str:
+    items = "\n".join(f'<li><a href="{name}">{html.escape(title)}</a></li>' for name, title in toc)
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" xml:lang="zh-CN">
+<head><title>{html.escape(book_title)}</title></head>
+<body>
+<nav epub:type="toc"><h1>{html.escape(book_title)}</h1><ol>
+{items}
+</ol></nav>
+</body>
+</html>
+"""
+
+
+def _content_opf(book_id: str, book_title: str, toc: List[Tuple[str, str]]) -> str:
+    manifest = "\n".join(
+        f'    <item id="c{i}" href="{name}" media-type="application/xhtml+xml"/>' for i, (name, _) in enumerate(toc)
+    )
+    spine = "\n".join(f'    <itemref idref="c{i}"/>' for i in range(len(toc)))
+    modified = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id" xml:lang="zh-CN">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="book-id">{book_id}</dc:identifier>
+    <dc:title>{html.escape(book_title)}</dc:title>
+    <dc:language>zh-CN</dc:language>
+    <meta property="dcterms:modified">{modified}</meta>
+  </metadata>
+  <manifest>
+    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>
+{manifest}
+  </manifest>
+  <spine>
+{spine}
+  </spine>
+</package>
+"""
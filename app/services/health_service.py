@@ -0,0 +1,111 @@
+"""
+健康检查服务
+依赖检查（数据库、Redis、LLM配置）在后台按固定间隔执行并缓存结果，
+探针接口只读取缓存，不会因为依赖缓慢而阻塞事件循环。
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine, async_redis
+from app.services.ai_service import ai_service
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _ping_database():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+class HealthMonitor:
+    """后台依赖检查与结果缓存"""
+
+    def __init__(self):
+        self.services: Dict[str, str] = {
+            "database": "unknown",
+            "redis": "unknown",
+            "llm": "unknown"
+        }
+        self.checked_at: Optional[datetime] = None
+        self._checked_monotonic = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _check_database(self) -> str:
+        try:
+            await asyncio.wait_for(asyncio.to_thread(_ping_database), timeout=settings.health_check_timeout)
+            return "connected"
+        except Exception as e:
+            logger.debug("数据库健康检查失败: {}", e)
+            return "disconnected"
+
+    async def _check_redis(self) -> str:
+        return "connected" if await async_redis.ping() else "disconnected"
+
+    def _check_llm(self) -> str:
+        return "configured" if ai_service.model else "not_configured"
+
+    async def refresh(self):
+        """执行一次所有依赖检查"""
+        database, redis_status = await asyncio.gather(self._check_database(), self._check_redis())
+        services = {"database": database, "redis": redis_status, "llm": self._check_llm()}
+
+        if services != self.services:
+            logger.info("依赖状态变化: {}", services)
+        self.services = services
+        self.checked_at = datetime.now()
+        self._checked_monotonic = time.monotonic()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"健康检查执行失败: {e}")
+            await asyncio.sleep(settings.health_check_interval)
+
+    def start(self):
+        """启动后台检查任务"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台检查任务"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @property
+    def is_fresh(self) -> bool:
+        """检查结果是否在有效期内（后台任务卡住时视为未知）"""
+        return time.monotonic() - self._checked_monotonic <= settings.health_check_interval * 3
+
+    @property
+    def ready(self) -> bool:
+        """数据库可用即可接收流量；Redis不可用时服务降级运行"""
+        return self.is_fresh and self.services["database"] == "connected"
+
+    @property
+    def status(self) -> str:
+        if not self.ready:
+            return "unhealthy"
+        if self.services["redis"] != "connected":
+            return "degraded"
+        return "healthy"
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "services": dict(self.services),
+            "checked_at": self.checked_at
+        }
+
+
+# 全局健康检查实例
+health_monitor = HealthMonitor()
@@ -0,0 +1,149 @@
+"""
+用户配额服务
+- 并发生成槽位：Redis计数器，Lua脚本原子地检查并占用，生成结束或取消时释放
+- 每日字符预算：按小时分桶计数，滚动24小时求和
+Redis不可用时并发槽位退化为进程内计数，字符预算不做限制
+"""
+
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List
+
+from app.config import settings
+from app.database import async_redis
+from app.utils.exceptions import QuotaExceededException
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# KEYS[1]: 并发计数键; ARGV: 上限, 过期秒数; 返回占用后的计数，已满返回-1
+ACQUIRE_SLOT_SCRIPT = """
+local current = tonumber(redis.call('get', KEYS[1]) or '0')
+if current >= tonumber(ARGV[1]) then
+    return -1
+end
+current = redis.call('incr', KEYS[1])
+redis.call('expire', KEYS[1], ARGV[2])
+return current
+"""
+
+RELEASE_SLOT_SCRIPT = """
+local current = tonumber(redis.call('get', KEYS[1]) or '0')
+if current <= 0 then
+    return 0
+end
+return redis.call('decr', KEYS[1])
+"""
+
+USAGE_WINDOW_HOURS = 24
+
+
+def _slot_key(user_id: str) -> str:
+    return f"quota:inflight:{user_id}"
+
+
+def _usage_keys(user_id: str) -> List[str]:
+    hour = int(time.time() // 3600)
+    return [f"quota:chars:{user_id}:{hour - i}" for i in range(USAGE_WINDOW_HOURS)]
+
+
+class QuotaService:
+    """并发生成与字符预算配额"""
+
+    def __init__(self):
+        self._local_slots: Dict[str, int] = {}
+
+    async def used_characters(self, user_id: str) -> int:
+        """滚动24小时内已生成的字符数"""
+        values = await async_redis.mget(_usage_keys(user_id))
+        return sum(int(value) for value in values if value)
+
+    async def in_flight(self, user_id: str) -> int:
+        value = await async_redis.get(_slot_key(user_id))
+        if value is None:
+            return self._local_slots.get(user_id, 0)
+        return int(value)
+
+    async def _acquire(self, user_id: str) -> bool:
+        """占用一个并发槽位，返回是否由Redis记录"""
+        used = await self.used_characters(user_id)
+        if used >= settings.quota_daily_characters:
+            raise QuotaExceededException(
+                "今日生成额度已用完",
+                {"used_characters": used, "daily_characters": settings.quota_daily_characters}
+            )
+
+        limit = settings.quota_max_concurrent_generations
+        current = await async_redis.eval(
+            ACQUIRE_SLOT_SCRIPT, [_slot_key(user_id)], [limit, settings.quota_slot_ttl]
+        )
+        if current is None:
+            # Redis不可用，按进程内计数限制
+            current = self._local_slots.get(user_id, 0)
+            if current >= limit:
+                current = -1
+            else:
+                self._local_slots[user_id] = current + 1
+            in_redis = False
+        else:
+            in_redis = True
+
+        if current == -1:
+            raise QuotaExceededException(
+                "同时进行的生成任务过多，请等待当前任务完成",
+                {"max_concurrent_generations": limit}
+            )
+        return in_redis
+
+    async def _release(self, user_id: str, in_redis: bool):
+        if in_redis:
+            await async_redis.eval(RELEASE_SLOT_SCRIPT, [_slot_key(user_id)], [])
+            return
+        remaining = self._local_slots.get(user_id, 0) - 1
+        if remaining > 0:
+            self._local_slots[user_id] = remaining
+        else:
+            self._local_slots.pop(user_id, None)
+
+    @asynccontextmanager
+    async def generation_slot(self, user_id: str):
+        """
+        生成任务配额上下文：进入时检查预算并占用槽位，退出时（包括异常和取消）释放
+
+        Raises:
+            QuotaExceededException: 预算耗尽或并发已满
+        """
+        in_redis = await self._acquire(user_id)
+        try:
+            yield
+        finally:
+            await self._release(user_id, in_redis)
+
+    async def record_usage(self, user_id: str, characters: int):
+        """记录已生成的字符数"""
+        if characters <= 0:
+            return
+        key = _usage_keys(user_id)[0]
+
+        def build(pipe):
+            pipe.incrby(key, characters)
+            pipe.expire(key, (USAGE_WINDOW_HOURS + 1) * 3600)
+
+        await async_redis.pipeline(build, transaction=True, command="QUOTA_RECORD")
+
+    async def usage(self, user_id: str) -> Dict[str, Any]:
+        """用户当前配额使用情况"""
+        used = await self.used_characters(user_id)
+        in_flight = await self.in_flight(user_id)
+        return {
+            "in_flight_generations": in_flight,
+            "max_concurrent_generations": settings.quota_max_concurrent_generations,
+            "used_characters": used,
+            "daily_characters": settings.quota_daily_characters,
+            "remaining_characters": max(0, settings.quota_daily_characters - used),
+            "window_hours": USAGE_WINDOW_HOURS
+        }
+
+
+# 全局配额服务
+quota_service = QuotaService()
@@ -0,0 +1,124 @@
+"""
+限流服务
+基于Redis Lua脚本的原子令牌桶，Redis不可用时退化为进程内令牌桶
+"""
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from app.config import settings
+from app.database import async_redis
+from app.utils.logger import get_logger
+from app.utils.ttl_cache import TTLCache
+
+logger = get_logger(__name__)
+
+# KEYS[1]: 桶键; ARGV: 容量, 每秒补充令牌数, 当前时间, 消耗令牌数
+# 返回: {是否放行, 剩余令牌数, 需要等待的毫秒数}
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local bucket = redis.call('hmget', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = math.ceil((cost - tokens) / rate * 1000)
+end
+
+redis.call('hset', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('pexpire', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, math.floor(tokens), wait}
+"""
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """解析 "10/hour" 形式的限流配置，返回 (次数, 周期秒数)"""
+    count, period = rate.split("/", 1)
+    return int(count), PERIODS[period.strip()]
+
+
+@dataclass
+class RateLimitResult:
+    """单次限流判定结果"""
+    allowed: bool
+    limit: int
+    remaining: int
+    period: int
+    retry_after: float
+    reset_after: float
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """标准限流响应头（RateLimit-* 草案字段 + 拒绝时的 Retry-After）"""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_after)),
+            "RateLimit-Policy": f"{self.limit};w={self.period}",
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class RateLimiter:
+    """令牌桶限流器"""
+
+    def __init__(self):
+        # Redis不可用时的进程内桶：{键: (剩余令牌, 更新时间)}
+        self._local = TTLCache(maxsize=10000)
+
+    def _hit_local(self, key: str, capacity: int, rate: float, now: float, cost: int) -> Tuple[bool, float, float]:
+        tokens, ts = self._local.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+        if tokens >= cost:
+            tokens -= cost
+            allowed, wait = True, 0.0
+        else:
+            allowed, wait = False, (cost - tokens) / rate
+        self._local.set(key, (tokens, now), ttl=capacity / rate)
+        return allowed, tokens, wait
+
+    async def hit(self, route_class: str, identity: str, cost: int = 1) -> RateLimitResult:
+        """消耗一个令牌并返回判定结果"""
+        limit, period = parse_rate(settings.rate_limits[route_class])
+        rate = limit / period
+        key = f"ratelimit:{route_class}:{identity}"
+        now = time.time()
+
+        result = await async_redis.eval(TOKEN_BUCKET_SCRIPT, [key], [limit, rate, now, cost])
+        if result is not None:
+            allowed, tokens, wait = bool(result[0]), float(result[1]), int(result[2]) / 1000
+        else:
+            allowed, tokens, wait = self._hit_local(key, limit, rate, now, cost)
+
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            remaining=int(tokens),
+            period=period,
+            retry_after=wait,
+            reset_after=(limit - tokens) / rate
+        )
+
+
+# 全局限流器
+rate_limiter = RateLimiter()
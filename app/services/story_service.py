@@ -1,16 +1,35 @@
+from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
+from app.config import settings
+from app.database import SessionLocal
+from app.database.routing import read_only, pin_primary
 from app.models import Story, Chapter, Choice, StoryStyle, StoryStatus, ChoiceType, WorldView
+from app.models.responses import ChapterDetail
 from app.services.ai_service import ai_service
+from app.services.cache_service import cached, dto_cache
+from app.services.quota_service import quota_service
 from app.services.worldview_service import WorldViewService
+from app.utils.exceptions import QuotaExceededException
+from app.utils.http_cache import compute_digest
+from app.utils.logger import get_logger
+from app.utils.tracing import trace_class
+from datetime import datetime
+import asyncio
 import uuid
 
+logger = get_logger(__name__)
+
+# 故事聚合接口可选择返回的部分
+BUNDLE_SECTIONS = ("worldview", "chapters", "latest", "choices")
+
+@trace_class
 class StoryService:
     def __init__(self, db: Session):
         self.db = db
         self.worldview_service = WorldViewService(db)
     
-    def create_story(self, style: StoryStyle, title: str = None, user_id: str = None) -> Story:
+    async def create_story(self, style: StoryStyle, title: str = None, user_id: str = None) -> Story:
         """创建新故事"""
         if not title:
             style_titles = {
@@ -31,6 +50,7 @@ class StoryService:
         self.db.add(story)
         self.db.commit()
         self.db.refresh(story)
+        await dto_cache.invalidate("story", story.id)
         
         return story
     
@@ -38,7 +58,7 @@ class StoryService:
         """创建新故事并生成世界观框架"""
         try:
             # 创建故事
-            story = self.create_story(style, title, user_id)
+            story = await self.create_story(style, title, user_id)
             
             # 生成世界观框架
             worldview = await self.worldview_service.create_worldview(
@@ -54,13 +74,22 @@ class StoryService:
         except Exception as e:
             # 如果世界观生成失败，删除已创建的故事
             if 'story' in locals():
-                self.delete_story(story.id)
+                await self.delete_story(story.id)
             raise e
     
+    @read_only
     def get_story(self, story_id: uuid.UUID) -> Optional[Story]:
         """获取故事详情"""
         return self.db.query(Story).filter(Story.id == story_id).first()
     
+    @cached("story", ttl=lambda: settings.cache_story_ttl)
+    def get_story_dto(self, story_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        """获取故事的缓存DTO：{"user_id": 所属用户, "story": 故事字典}"""
+        story = self.get_story(story_id)
+        if not story:
+            return None
+        return {"user_id": story.user_id, "story": story.to_dict()}
+    
     def get_all_stories(self) -> List[Story]:
         """获取所有故事列表"""
         return self.db.query(Story).order_by(Story.created_at.desc()).all()
@@ -71,12 +100,14 @@ class StoryService:
             Story.user_id == user_id
         ).order_by(Story.created_at.desc()).all()
     
+    @read_only
     def get_story_chapters(self, story_id: uuid.UUID) -> List[Chapter]:
         """获取故事的所有章节"""
         return self.db.query(Chapter).filter(
             Chapter.story_id == story_id
         ).order_by(Chapter.chapter_number).all()
     
+    @read_only
     def get_story_choices_history(self, story_id: uuid.UUID) -> List[Dict[str, Any]]:
         """获取故事的选择历史"""
         chapters = self.get_story_chapters(story_id)
@@ -97,10 +128,76 @@ class StoryService:
         
         return choices_history
     
+    @read_only
+    def get_story_bundle(self, story_id: uuid.UUID, include: Set[str]) -> Optional[Dict[str, Any]]:
+        """
+        一次性获取阅读页所需数据，查询次数固定（与章节数无关）：
+        故事、世界观、章节目录（不含正文）、最新章节、最新章节的选择选项各一次
+
+        Args:
+            story_id: 故事ID
+            include: 需要返回的部分，取值见 BUNDLE_SECTIONS
+
+        Returns:
+            {"user_id": 所属用户, "validators": 用于派生ETag的版本字段, "data": 聚合数据}，故事不存在时返回None
+        """
+        story = self.get_story(story_id)
+        if not story:
+            return None
+
+        data: Dict[str, Any] = {"story": story.to_dict()}
+        validators: List[Any] = [story.id, story.updated_at, sorted(include)]
+
+        if "worldview" in include:
+            worldview = self.db.query(WorldView).filter(WorldView.story_id == story_id).first()
+            data["worldview"] = worldview.to_dict() if worldview else None
+            validators.append(worldview.updated_at if worldview else None)
+
+        latest_id = None
+        if include & {"chapters", "latest", "choices"}:
+            rows = self.db.query(
+                Chapter.id, Chapter.chapter_number, Chapter.title, Chapter.summary, Chapter.created_at
+            ).filter(Chapter.story_id == story_id).order_by(Chapter.chapter_number).all()
+            latest_id = rows[-1].id if rows else None
+            validators.append((len(rows), latest_id))
+            if "chapters" in include:
+                data["chapters"] = [
+                    {
+                        "id": row.id,
+                        "chapter_number": row.chapter_number,
+                        "title": row.title,
+                        "summary": row.summary,
+                        "created_at": row.created_at
+                    }
+                    for row in rows
+                ]
+
+        if "latest" in include:
+            chapter = self.db.query(Chapter).filter(Chapter.id == latest_id).first() if latest_id else None
+            data["latest_chapter"] = self._chapter_detail_dict(chapter) if chapter else None
+
+        if "choices" in include:
+            choices = self.db.query(Choice).filter(
+                Choice.chapter_id == latest_id
+            ).order_by(Choice.created_at).all() if latest_id else []
+            data["choices"] = [choice.to_dict() for choice in choices]
+            validators.append(sorted((choice.id, choice.is_selected) for choice in choices))
+
+        return {"user_id": story.user_id, "validators": validators, "data": data}
+    
+    def get_recent_chapter_summaries(self, story_id: uuid.UUID, limit: int = None) -> List[Tuple[int, str]]:
+        """获取最近若干章的摘要，按章节顺序返回 (章节号, 摘要) 列表"""
+        limit = limit or settings.chapter_summary_window
+        rows = self.db.query(Chapter.chapter_number, Chapter.summary).filter(
+            Chapter.story_id == story_id
+        ).order_by(Chapter.chapter_number.desc()).limit(limit).all()
+        return [(row.chapter_number, row.summary) for row in reversed(rows)]
+    
 
 
     async def generate_first_chapter_stream(self, story_id: uuid.UUID):
         """流式生成故事的第一章"""
+        pin_primary(self.db)
         try:
             story = self.get_story(story_id)
             if not story:
@@ -113,113 +210,336 @@ class StoryService:
                 yield {"type": "error", "message": "故事缺少世界观框架，请先生成世界观"}
                 return
 
-            # 构建故事数据
-            story_data = {
-                "style": story.style.value,
-                "title": story.title,
-                "current_chapter_number": 1,
-                "chapter_summaries": story.chapter_summaries or [],
-                "character_info": story.character_info or {}
-            }
+            owner_id = story.user_id
+            async with quota_service.generation_slot(owner_id):
+                # 构建故事数据
+                story_data = {
+                    "style": story.style.value,
+                    "title": story.title,
+                    "current_chapter_number": 1,
+                    "chapter_summaries": [],
+                    "character_info": story.character_info or {}
+                }
 
-            # 获取世界观上下文
-            worldview_context = worldview.get_context_summary()
-
-            # 流式生成章节内容
-            accumulated_content = ""
-            chapter_title = ""
-
-            async for chunk in ai_service.generate_chapter_stream(
-                story_data,
-                worldview_context=worldview_context
-            ):
-                if chunk["type"] == "title":
-                    chapter_title = chunk["content"]
-                    yield chunk
-                elif chunk["type"] == "content":
-                    accumulated_content += chunk["content"]
-                    yield chunk
-                elif chunk["type"] == "complete":
-                    # 创建章节记录
-                    chapter = Chapter(
-                        story_id=story.id,
-                        chapter_number=1,
-                        title=chunk["title"],
-                        content=chunk["content"],
-                        summary=chunk["content"][:200] + "..."
-                    )
-
-                    self.db.add(chapter)
-                    self.db.commit()  # 先提交章节以获取ID
-                    self.db.refresh(chapter)
-
-                    # 生成选择选项
-                    try:
-                        choices_text = await ai_service.generate_choices(
-                            chunk["content"],
-                            story.style
-                        )
+                # 获取世界观上下文
+                worldview_context = worldview.get_context_summary()
+
+                # 流式生成章节内容
+                accumulated_content = ""
+                chapter_title = ""
 
-                        for choice_text in choices_text:
-                            choice = Choice(
-                                chapter_id=chapter.id,
-                                choice_text=choice_text,
-                                choice_type=ChoiceType.AI_GENERATED
+                async for chunk in ai_service.generate_chapter_stream(
+                    story_data,
+                    worldview_context=worldview_context
+                ):
+                    if chunk["type"] == "title":
+                        chapter_title = chunk["content"]
+                        yield chunk
+                    elif chunk["type"] == "content":
+                        accumulated_content += chunk["content"]
+                        yield chunk
+                    elif chunk["type"] == "complete":
+                        # 生成选择选项，章节与选项一起持久化
+                        try:
+                            choices_text = await ai_service.generate_choices(
+                                chunk["content"],
+                                story.style
                             )
-                            self.db.add(choice)
 
-                        # 更新故事状态
-                        story.current_chapter_number = 1
-                        story.chapter_summaries = [chapter.summary]
+                            result = await self._persist_chapter(
+                                story,
+                                chapter_number=1,
+                                title=chunk["title"],
+                                content=chunk["content"],
+                                choices_text=choices_text
+                            )
 
-                        self.db.commit()
-                        self.db.refresh(chapter)
+                            await quota_service.record_usage(
+                                owner_id, len(chunk["content"]) + sum(len(text) for text in choices_text)
+                            )
 
-                        # 发送完成信号，包含章节信息和选择选项
-                        choices = self.get_chapter_choices(chapter.id)
-                        yield {
-                            "type": "complete",
-                            "chapter": chapter.to_dict(),
-                            "choices": [choice.to_dict() for choice in choices]
-                        }
+                            # 发送完成信号，包含章节信息和选择选项
+                            yield {"type": "complete", **result}
 
-                    except Exception as e:
-                        yield {"type": "error", "message": f"生成选择选项失败: {str(e)}"}
+                        except Exception as e:
+                            yield {"type": "error", "message": f"生成选择选项失败: {str(e)}"}
 
+        except QuotaExceededException as e:
+            yield {"type": "error", "message": e.message, "error_code": e.error_code}
         except Exception as e:
             yield {"type": "error", "message": f"生成第一章失败: {str(e)}"}
 
 
+    @read_only
     def get_chapter(self, chapter_id: uuid.UUID) -> Optional[Chapter]:
         """获取章节详情"""
         return self.db.query(Chapter).filter(Chapter.id == chapter_id).first()
     
+    @read_only
+    def get_chapter_with_owner(self, chapter_id: uuid.UUID) -> Optional[Tuple[Chapter, str]]:
+        """获取章节及其所属用户ID（单次联表查询，不加载故事的JSON字段）"""
+        row = self.db.query(Chapter, Story.user_id).join(
+            Story, Story.id == Chapter.story_id
+        ).filter(Chapter.id == chapter_id).first()
+        return (row[0], row[1]) if row else None
+    
+    @cached("chapter", ttl=lambda: settings.cache_chapter_ttl)
+    def get_chapter_dto(self, chapter_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        """获取章节的缓存DTO
+
+        返回 {"user_id", "etag", "created_at", "payload"}，payload 为预先渲染好的章节详情JSON。
+        """
+        row = self._get_chapter_payload_row(chapter_id)
+        if not row:
+            return None
+
+        payload, etag = row.payload, row.etag
+        if payload is None or etag is None:
+            # 早期章节没有预渲染数据，读取时补算
+            chapter, _ = self.get_chapter_with_owner(chapter_id)
+            payload = self._render_chapter_payload(chapter)
+            etag = chapter.etag or compute_digest(
+                chapter.id, chapter.title, chapter.content, chapter.created_at.isoformat()
+            )
+        return self._chapter_dto(row.user_id, etag, row.created_at, payload)
+    
+    @read_only
+    def _get_chapter_payload_row(self, chapter_id: uuid.UUID):
+        """查询章节的预渲染JSON及校验字段（不单独加载正文列）"""
+        return self.db.query(
+            Story.user_id, Chapter.payload, Chapter.etag, Chapter.created_at
+        ).select_from(Chapter).join(
+            Story, Story.id == Chapter.story_id
+        ).filter(Chapter.id == chapter_id).first()
+    
+    def iter_chapter_payloads(self, chapter_ids: List[str], user_id: str) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        按请求顺序批量读取章节的预渲染JSON，逐个产出 (章节ID, JSON)
+
+        每批 chapter_batch_yield_per 个ID执行一次 IN 查询，内存中只保留一批；
+        不存在或不属于该用户的章节产出 (章节ID, None)
+        """
+        size = settings.chapter_batch_yield_per
+        for start in range(0, len(chapter_ids), size):
+            batch = chapter_ids[start:start + size]
+            rows = self.db.query(Chapter.id, Chapter.payload).join(
+                Story, Story.id == Chapter.story_id
+            ).filter(
+                Chapter.id.in_(batch),
+                Story.user_id == user_id
+            ).all()
+
+            payloads = {}
+            for row in rows:
+                payload = row.payload
+                if payload is None:
+                    # 早期章节没有预渲染数据，读取时补算
+                    payload = self._render_chapter_payload(self.db.get(Chapter, row.id))
+                payloads[row.id] = payload
+            for chapter_id in batch:
+                yield chapter_id, payloads.get(chapter_id)
+    
+    @read_only
+    def get_chapter_payloads(self, chapter_ids: List[str], user_id: str) -> Dict[str, str]:
+        """批量读取章节的预渲染JSON，返回 {章节ID: JSON}（按请求顺序，不含缺失的章节）"""
+        return {
+            chapter_id: payload
+            for chapter_id, payload in self.iter_chapter_payloads(chapter_ids, user_id)
+            if payload is not None
+        }
+    
+    @staticmethod
+    def _chapter_dto(user_id: str, etag: str, created_at: datetime, payload: str) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "etag": etag,
+            "created_at": created_at.isoformat(),
+            "payload": payload
+        }
+    
+    @classmethod
+    def _render_chapter_payload(cls, chapter: Chapter) -> str:
+        """渲染章节详情的标准JSON"""
+        return ChapterDetail(**cls._chapter_detail_dict(chapter)).model_dump_json()
+    
+    @staticmethod
+    def _chapter_detail_dict(chapter: Chapter) -> Dict[str, Any]:
+        """章节详情字典（不含选择选项）"""
+        return {
+            "id": str(chapter.id),
+            "story_id": str(chapter.story_id),
+            "chapter_number": chapter.chapter_number,
+            "title": chapter.title,
+            "content": chapter.content,
+            "summary": chapter.summary,
+            "created_at": chapter.created_at.isoformat()
+        }
+    
+    @read_only
+    def get_chapter_validators(self, chapter_id: uuid.UUID) -> Optional[Dict[str, Any]]:
+        """只查询章节的所属用户、ETag和创建时间，用于条件请求（不加载正文）"""
+        row = self.db.query(Story.user_id, Chapter.etag, Chapter.created_at).select_from(Chapter).join(
+            Story, Story.id == Chapter.story_id
+        ).filter(Chapter.id == chapter_id).first()
+        if not row:
+            return None
+        return {"user_id": row.user_id, "etag": row.etag, "created_at": row.created_at}
+    
+    @read_only
+    def get_chapter_choices_with_owner(self, chapter_id: uuid.UUID) -> Optional[Tuple[str, List[Choice]]]:
+        """获取章节所属用户ID及其选择选项（单次联表查询），章节不存在时返回None"""
+        rows = self.db.query(Story.user_id, Choice).select_from(Chapter).join(
+            Story, Story.id == Chapter.story_id
+        ).outerjoin(
+            Choice, Choice.chapter_id == Chapter.id
+        ).filter(Chapter.id == chapter_id).all()
+
+        if not rows:
+            return None
+        return rows[0][0], [choice for _, choice in rows if choice is not None]
+    
+    async def _persist_chapter(self, story: Story, chapter_number: int, title: str, content: str, choices_text: List[str]) -> Dict[str, Any]:
+        """在一个事务中写入章节及其选择选项并更新故事进度
+
+        主键和时间戳在客户端生成，返回的章节/选项字典在提交前构建，无需提交后重新查询。
+        """
+        now = datetime.utcnow()
+        chapter_id = str(uuid.uuid4())
+        chapter = Chapter(
+            id=chapter_id,
+            story_id=story.id,
+            chapter_number=chapter_number,
+            title=title,
+            content=content,
+            summary=content[:200] + "...",
+            etag=compute_digest(chapter_id, title, content, now.isoformat()),
+            created_at=now
+        )
+        # 章节写入后不再变化，在此一次性渲染读取接口使用的JSON
+        chapter.payload = self._render_chapter_payload(chapter)
+        chapter.choices = [
+            Choice(
+                id=str(uuid.uuid4()),
+                chapter_id=chapter_id,
+                choice_text=choice_text,
+                choice_type=ChoiceType.AI_GENERATED,
+                is_selected=False,
+                created_at=now
+            )
+            for choice_text in choices_text
+        ]
+        story.current_chapter_number = chapter_number
+        story_id, owner_id = story.id, story.user_id
+        chapter_dto = self._chapter_dto(owner_id, chapter.etag, now, chapter.payload)
+
+        result = {
+            "chapter": chapter.to_dict(),
+            "choices": [choice.to_dict() for choice in chapter.choices]
+        }
+
+        try:
+            self.db.add(chapter)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        await dto_cache.invalidate("story", story_id)
+        await dto_cache.put("chapter", chapter_id, chapter_dto, settings.cache_chapter_ttl)
+        return result
+    
     def get_chapter_choices(self, chapter_id: uuid.UUID) -> List[Choice]:
         """获取章节的选择选项"""
         return self.db.query(Choice).filter(
             Choice.chapter_id == chapter_id
         ).all()
     
-    def delete_story(self, story_id: uuid.UUID) -> bool:
-        """删除故事及其所有相关数据"""
+    async def delete_story(self, story_id: uuid.UUID) -> bool:
+        """删除故事及其所有相关数据
+
+        使用基于集合的DELETE语句在同一事务中删除选择、章节、世界观和故事，
+        不会把章节正文等数据加载到会话中。
+        """
+        chapter_ids = self._delete_story_rows(story_id)
+        await self.invalidate_story_cache(story_id, chapter_ids)
+        return True
+
+    def _delete_story_rows(self, story_id: uuid.UUID) -> List[str]:
+        """在一个事务中删除故事的所有数据，返回被删除的章节ID"""
         try:
-            # 获取故事
-            story = self.get_story(story_id)
-            if not story:
+            chapter_ids = self.db.execute(
+                select(Chapter.id).where(Chapter.story_id == story_id)
+            ).scalars().all()
+            self._delete_story_children(story_id)
+            self.db.execute(
+                delete(WorldView).where(WorldView.story_id == story_id),
+                execution_options={"synchronize_session": False}
+            )
+            result = self.db.execute(
+                delete(Story).where(Story.id == story_id),
+                execution_options={"synchronize_session": False}
+            )
+            if result.rowcount == 0:
                 raise ValueError("故事不存在")
-            
-            # 由于模型中设置了cascade="all, delete-orphan"
-            # 删除故事时会自动级联删除所有相关的章节和选择
-            self.db.delete(story)
+
             self.db.commit()
-            
-            return True
+            return list(chapter_ids)
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+    def delete_story_in_batches(self, story_id: uuid.UUID, batch_size: int = None) -> List[str]:
+        """分批删除故事数据，每批单独提交，适用于章节很多的故事；返回被删除的章节ID"""
+        batch_size = batch_size or settings.story_delete_batch_size
+        deleted_ids: List[str] = []
+        try:
+            while True:
+                chapter_ids = self.db.execute(
+                    select(Chapter.id).where(Chapter.story_id == story_id).limit(batch_size)
+                ).scalars().all()
+                if not chapter_ids:
+                    break
+
+                self._delete_story_children(story_id, chapter_ids)
+                self.db.commit()
+                deleted_ids.extend(chapter_ids)
+
+            # 章节清理完毕后，在一个事务中删除世界观和故事本身
+            return deleted_ids + self._delete_story_rows(story_id)
         except Exception as e:
             self.db.rollback()
             raise e
+
+    @staticmethod
+    async def invalidate_story_cache(story_id: uuid.UUID, chapter_ids: List[str]):
+        """清除故事、世界观及其章节的缓存"""
+        await dto_cache.invalidate("chapter", *chapter_ids)
+        await dto_cache.invalidate("story", story_id)
+        await dto_cache.invalidate("worldview", story_id)
+
+    def _delete_story_children(self, story_id: uuid.UUID, chapter_ids: List[str] = None):
+        """删除章节及其选择（不提交事务）"""
+        if chapter_ids is None:
+            chapter_filter = Chapter.story_id == story_id
+            choice_filter = Choice.chapter_id.in_(
+                select(Chapter.id).where(Chapter.story_id == story_id)
+            )
+        else:
+            chapter_filter = Chapter.id.in_(chapter_ids)
+            choice_filter = Choice.chapter_id.in_(chapter_ids)
+
+        self.db.execute(
+            delete(Choice).where(choice_filter),
+            execution_options={"synchronize_session": False}
+        )
+        self.db.execute(
+            delete(Chapter).where(chapter_filter),
+            execution_options={"synchronize_session": False}
+        )
     
     async def generate_next_chapter_stream(self, story_id: uuid.UUID, selected_choice_id: uuid.UUID = None, custom_choice: str = None):
         """基于世界观+章节总结+用户选择流式生成下一章"""
+        pin_primary(self.db)
         try:
             story = self.get_story(story_id)
             if not story:
@@ -232,117 +552,118 @@ class StoryService:
                 yield {"type": "error", "message": "故事缺少世界观框架"}
                 return
             
-            # 处理用户选择
-            choice_text = None
-            if custom_choice:
-                # 用户自定义选择
-                choice_text = custom_choice
-                # 创建自定义选择记录
-                last_chapter = self.db.query(Chapter).filter(
-                    Chapter.story_id == story_id
-                ).order_by(Chapter.chapter_number.desc()).first()
+            owner_id = story.user_id
+            async with quota_service.generation_slot(owner_id):
+                # 处理用户选择
+                choice_text = None
+                if custom_choice:
+                    # 用户自定义选择
+                    choice_text = custom_choice
+                    # 创建自定义选择记录
+                    last_chapter = self.db.query(Chapter).filter(
+                        Chapter.story_id == story_id
+                    ).order_by(Chapter.chapter_number.desc()).first()
                 
-                if last_chapter:
-                    custom_choice_obj = Choice(
-                        chapter_id=last_chapter.id,
-                        choice_text=custom_choice,
-                        choice_type=ChoiceType.USER_CUSTOM,
-                        is_selected=True
-                    )
-                    self.db.add(custom_choice_obj)
-            else:
-                # AI生成的选择
-                if selected_choice_id:
-                    selected_choice = self.db.query(Choice).filter(
-                        Choice.id == selected_choice_id
-                    ).first()
+                    if last_chapter:
+                        custom_choice_obj = Choice(
+                            chapter_id=last_chapter.id,
+                            choice_text=custom_choice,
+                            choice_type=ChoiceType.USER_CUSTOM,
+                            is_selected=True
+                        )
+                        self.db.add(custom_choice_obj)
+                else:
+                    # AI生成的选择
+                    if selected_choice_id:
+                        selected_choice = self.db.query(Choice).filter(
+                            Choice.id == selected_choice_id
+                        ).first()
                     
-                    if not selected_choice:
-                        yield {"type": "error", "message": "选择不存在"}
-                        return
+                        if not selected_choice:
+                            yield {"type": "error", "message": "选择不存在"}
+                            return
                     
-                    # 标记选择为已选中
-                    selected_choice.is_selected = True
-                    choice_text = selected_choice.choice_text
+                        # 标记选择为已选中
+                        selected_choice.is_selected = True
+                        choice_text = selected_choice.choice_text
             
-            # 构建故事数据
-            story_data = {
-                "style": story.style.value,
-                "title": story.title,
-                "current_chapter_number": story.current_chapter_number + 1,
-                "chapter_summaries": story.chapter_summaries or [],
-                "character_info": story.character_info or {}
-            }
+                # 构建故事数据（只带入最近若干章的摘要）
+                recent_summaries = self.get_recent_chapter_summaries(story_id)
+                story_data = {
+                    "style": story.style.value,
+                    "title": story.title,
+                    "current_chapter_number": story.current_chapter_number + 1,
+                    "chapter_summaries": [summary for _, summary in recent_summaries],
+                    "chapter_summaries_start": recent_summaries[0][0] if recent_summaries else 1,
+                    "character_info": story.character_info or {}
+                }
             
-            # 获取世界观上下文
-            worldview_context = worldview.get_context_summary()
+                # 获取世界观上下文
+                worldview_context = worldview.get_context_summary()
             
-            # 流式生成新章节
-            accumulated_content = ""
-            chapter_title = ""
+                # 流式生成新章节
+                accumulated_content = ""
+                chapter_title = ""
             
-            async for chunk in ai_service.generate_chapter_stream(
-                story_data, 
-                worldview_context=worldview_context,
-                previous_choice=choice_text
-            ):
-                if chunk["type"] == "title":
-                    chapter_title = chunk["content"]
-                    yield chunk
-                elif chunk["type"] == "content":
-                    accumulated_content += chunk["content"]
-                    yield chunk
-                elif chunk["type"] == "complete":
-                    # 创建章节记录
-                    new_chapter = Chapter(
-                        story_id=story.id,
-                        chapter_number=story.current_chapter_number + 1,
-                        title=chunk["title"],
-                        content=chunk["content"],
-                        summary=chunk["content"][:200] + "..."
-                    )
-                    
-                    self.db.add(new_chapter)
-                    self.db.commit()  # 先提交章节以获取ID
-                    self.db.refresh(new_chapter)
-                    
-                    # 生成新的选择选项
-                    try:
-                        choices_text = await ai_service.generate_choices(
-                            chunk["content"], 
-                            story.style
-                        )
-                        
-                        for choice_text in choices_text:
-                            choice = Choice(
-                                chapter_id=new_chapter.id,
-                                choice_text=choice_text,
-                                choice_type=ChoiceType.AI_GENERATED
+                async for chunk in ai_service.generate_chapter_stream(
+                    story_data, 
+                    worldview_context=worldview_context,
+                    previous_choice=choice_text
+                ):
+                    if chunk["type"] == "title":
+                        chapter_title = chunk["content"]
+                        yield chunk
+                    elif chunk["type"] == "content":
+                        accumulated_content += chunk["content"]
+                        yield chunk
+                    elif chunk["type"] == "complete":
+                        # 生成新的选择选项，章节、选项和用户选择记录在同一事务中提交
+                        try:
+                            choices_text = await ai_service.generate_choices(
+                                chunk["content"], 
+                                story.style
                             )
-                            self.db.add(choice)
-                        
-                        # 更新故事状态
-                        story.current_chapter_number += 1
-                        summaries = story.chapter_summaries or []
-                        summaries.append(new_chapter.summary)
-                        story.chapter_summaries = summaries
                         
-                        self.db.commit()
-                        self.db.refresh(new_chapter)
+                            result = await self._persist_chapter(
+                                story,
+                                chapter_number=story.current_chapter_number + 1,
+                                title=chunk["title"],
+                                content=chunk["content"],
+                                choices_text=choices_text
+                            )
                         
-                        # 发送完成信号，包含章节信息和选择选项
-                        choices = self.get_chapter_choices(new_chapter.id)
-                        yield {
-                            "type": "complete",
-                            "chapter": new_chapter.to_dict(),
-                            "choices": [choice.to_dict() for choice in choices]
-                        }
+                            await quota_service.record_usage(
+                                owner_id, len(chunk["content"]) + sum(len(text) for text in choices_text)
+                            )
+
+                            # 发送完成信号，包含章节信息和选择选项
+                            yield {"type": "complete", **result}
                         
-                    except Exception as e:
-                        yield {"type": "error", "message": f"生成选择选项失败: {str(e)}"}
-                elif chunk["type"] == "error":
-                    yield chunk
-                    
+                        except Exception as e:
+                            yield {"type": "error", "message": f"生成选择选项失败: {str(e)}"}
+                    elif chunk["type"] == "error":
+                        yield chunk
+
+        except QuotaExceededException as e:
+            self.db.rollback()
+            yield {"type": "error", "message": e.message, "error_code": e.error_code}
         except Exception as e:
             self.db.rollback()
-            yield {"type": "error", "message": f"生成章节失败: {str(e)}"}
\ No newline at end of file
+            yield {"type": "error", "message": f"生成章节失败: {str(e)}"}
+
+
+async def delete_story_in_background(story_id: str) -> None:
+    """后台任务：在线程中使用独立的数据库会话分批删除故事，完成后清除缓存"""
+    def run() -> List[str]:
+        db = SessionLocal()
+        try:
+            return StoryService(db).delete_story_in_batches(story_id)
+        finally:
+            db.close()
+
+    try:
+        chapter_ids = await asyncio.to_thread(run)
+        await StoryService.invalidate_story_cache(story_id, chapter_ids)
+        logger.info(f"后台删除故事完成: {story_id}")
+    except Exception as e:
+        logger.error(f"后台删除故事失败: {story_id}, 错误: {e}")
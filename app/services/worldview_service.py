@@ -1,9 +1,17 @@
 from sqlalchemy.orm import Session
 from typing import Optional, Dict, Any
+from app.config import settings
 from app.models import WorldView, Story, StoryStyle
 from app.services.ai_service import ai_service
+from app.services.cache_service import cached, dto_cache
+from app.services.quota_service import quota_service
+from app.database.routing import read_only
+from app.utils.tracing import trace_class
+from app.utils.exceptions import QuotaExceededException
+import json
 import uuid
 
+@trace_class
 class WorldViewService:
     def __init__(self, db: Session):
         self.db = db
@@ -25,10 +33,14 @@ class WorldViewService:
         
         try:
             # 使用AI生成世界观框架
-            worldview_data = await ai_service.generate_worldview(
-                story_title=story.title,
-                story_style=story.style,
-                story_theme=story_theme
+            async with quota_service.generation_slot(story.user_id):
+                worldview_data = await ai_service.generate_worldview(
+                    story_title=story.title,
+                    story_style=story.style,
+                    story_theme=story_theme
+                )
+            await quota_service.record_usage(
+                story.user_id, len(json.dumps(worldview_data, ensure_ascii=False))
             )
             
             # 创建世界观记录
@@ -52,19 +64,30 @@ class WorldViewService:
             self.db.add(worldview)
             self.db.commit()
             self.db.refresh(worldview)
+            await dto_cache.invalidate("worldview", story_id)
             
             return worldview
             
+        except QuotaExceededException:
+            self.db.rollback()
+            raise
         except Exception as e:
             self.db.rollback()
             raise Exception(f"生成世界观失败: {str(e)}")
     
+    @read_only
     def get_worldview(self, story_id: str) -> Optional[WorldView]:
         """获取故事的世界观框架"""
         return self.db.query(WorldView).filter(
             WorldView.story_id == story_id
         ).first()
     
+    @cached("worldview", ttl=lambda: settings.cache_worldview_ttl)
+    def get_worldview_dto(self, story_id: str) -> Optional[Dict[str, Any]]:
+        """获取故事世界观的缓存DTO"""
+        worldview = self.get_worldview(story_id)
+        return worldview.to_dict() if worldview else None
+    
     def get_worldview_by_id(self, worldview_id: str) -> Optional[WorldView]:
         """根据ID获取世界观"""
         return self.db.query(WorldView).filter(
@@ -85,6 +108,7 @@ class WorldViewService:
             
             self.db.commit()
             self.db.refresh(worldview)
+            await dto_cache.invalidate("worldview", worldview.story_id)
             
             return worldview
             
@@ -92,15 +116,17 @@ class WorldViewService:
             self.db.rollback()
             raise Exception(f"更新世界观失败: {str(e)}")
     
-    def delete_worldview(self, worldview_id: str) -> bool:
+    async def delete_worldview(self, worldview_id: str) -> bool:
         """删除世界观框架"""
         try:
             worldview = self.get_worldview_by_id(worldview_id)
             if not worldview:
                 raise ValueError("世界观不存在")
             
+            story_id = worldview.story_id
             self.db.delete(worldview)
             self.db.commit()
+            await dto_cache.invalidate("worldview", story_id)
             
             return True
             
@@ -113,12 +139,12 @@ class WorldViewService:
         # 删除现有世界观
         existing_worldview = self.get_worldview(story_id)
         if existing_worldview:
-            self.delete_worldview(existing_worldview.id)
+            await self.delete_worldview(existing_worldview.id)
         
         # 创建新的世界观
         return await self.create_worldview(story_id, story_theme)
     
-    def add_character(self, worldview_id: str, character_data: Dict[str, Any], character_type: str = 'supporting') -> WorldView:
+    async def add_character(self, worldview_id: str, character_data: Dict[str, Any], character_type: str = 'supporting') -> WorldView:
         """添加角色到世界观"""
         worldview = self.get_worldview_by_id(worldview_id)
         if not worldview:
@@ -138,6 +164,7 @@ class WorldViewService:
             
             self.db.commit()
             self.db.refresh(worldview)
+            await dto_cache.invalidate("worldview", worldview.story_id)
             
             return worldview
             
@@ -145,7 +172,7 @@ class WorldViewService:
             self.db.rollback()
             raise Exception(f"添加角色失败: {str(e)}")
     
-    def update_main_character(self, worldview_id: str, character_data: Dict[str, Any]) -> WorldView:
+    async def update_main_character(self, worldview_id: str, character_data: Dict[str, Any]) -> WorldView:
         """更新主角信息"""
         worldview = self.get_worldview_by_id(worldview_id)
         if not worldview:
@@ -159,6 +186,7 @@ class WorldViewService:
             
             self.db.commit()
             self.db.refresh(worldview)
+            await dto_cache.invalidate("worldview", worldview.story_id)
             
             return worldview
             
@@ -0,0 +1,147 @@
+"""
+认证缓存
+- 已验证令牌的payload按令牌哈希缓存到过期时间
+- 活跃用户记录进程内短时缓存，可选Redis二级缓存
+用户被停用时自动失效，使认证不再访问数据库
+"""
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.config import settings
+from app.database import async_redis, redis_delete
+from app.models import User
+from .jwt_utils import JWTUtils
+from .revocation import revocation_list
+from .ttl_cache import TTLCache
+
+_token_cache = TTLCache(maxsize=settings.auth_token_cache_size)
+_user_cache = TTLCache(maxsize=settings.auth_user_cache_size, ttl=settings.auth_user_cache_ttl)
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """已认证用户的只读快照（不绑定数据库会话）"""
+    id: str
+    username: str
+    user_id: str
+    is_active: bool
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            username=user.username,
+            user_id=user.user_id,
+            is_active=user.is_active,
+            created_at=user.created_at
+        )
+
+    @classmethod
+    def from_claims(cls, payload: Dict[str, Any]) -> Optional["CurrentUser"]:
+        """从令牌声明还原用户（旧令牌缺少声明时返回None）"""
+        if "uid" not in payload or "created_at" not in payload:
+            return None
+        return cls(
+            id=payload["user_id"],
+            username=payload["username"],
+            user_id=payload["uid"],
+            is_active=True,
+            created_at=datetime.fromisoformat(payload["created_at"])
+        )
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "CurrentUser":
+        data = json.loads(raw)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+
+def _user_key(user_id: str) -> str:
+    return f"auth:user:{user_id}"
+
+
+def verify_token_cached(token: str) -> Optional[Dict[str, Any]]:
+    """验证JWT令牌，验证结果按令牌哈希缓存到令牌过期"""
+    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    payload = _token_cache.get(token_hash)
+    if payload is not None:
+        return payload
+
+    payload = JWTUtils.verify_token(token)
+    if payload:
+        remaining = payload.get("exp", 0) - time.time()
+        if remaining > 0:
+            _token_cache.set(token_hash, payload, ttl=remaining)
+    return payload
+
+
+async def get_cached_user(user_id: str) -> Optional[CurrentUser]:
+    """从进程内缓存或Redis二级缓存获取活跃用户"""
+    user = _user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    if settings.auth_user_cache_redis:
+        raw = await async_redis.get(_user_key(user_id))
+        if raw:
+            user = CurrentUser.from_json(raw)
+            _user_cache.set(user_id, user)
+            return user
+    return None
+
+
+async def cache_user(user: User) -> CurrentUser:
+    """缓存活跃用户并返回其快照"""
+    current_user = CurrentUser.from_model(user)
+    _user_cache.set(current_user.id, current_user)
+    if settings.auth_user_cache_redis:
+        await async_redis.set(_user_key(current_user.id), current_user.to_json(), ex=settings.auth_user_cache_ttl)
+    return current_user
+
+
+def invalidate_user(user_id: str):
+    """使用户缓存失效（停用、修改用户信息时调用，可能在同步的ORM事件中执行）"""
+    _user_cache.delete(user_id)
+    if settings.auth_user_cache_redis:
+        redis_delete(_user_key(user_id))
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_update(mapper, connection, target):
+    """用户被停用或信息变更时清除缓存，并同步吊销列表"""
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ("is_active", "username")):
+        invalidate_user(target.id)
+    if state.attrs.is_active.history.has_changes():
+        # 吊销列表在事务提交后才更新，回滚的停用/启用不会生效
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault("revocation_changes", {})[target.id] = target.is_active
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_revocations(session):
+    for user_id, is_active in session.info.pop("revocation_changes", {}).items():
+        if is_active:
+            revocation_list.restore_user(user_id)
+        else:
+            revocation_list.revoke_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_revocations(session):
+    session.info.pop("revocation_changes", None)
@@ -4,7 +4,7 @@
 """
 
 from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from sqlalchemy.exc import SQLAlchemyError
@@ -57,9 +57,15 @@ class BusinessException(APIException):
         super().__init__(message, error_code, 400)
 
 
-async def api_exception_handler(request: Request, exc: APIException) -> JSONResponse:
+class QuotaExceededException(APIException):
+    """用户配额耗尽异常"""
+    def __init__(self, message: str, details: dict = None):
+        super().__init__(message, "QUOTA_EXCEEDED", 429, details)
+
+
+async def api_exception_handler(request: Request, exc: APIException) -> ORJSONResponse:
     """自定义API异常处理器"""
-    logger.error(f"API异常: {exc.message}, 错误码: {exc.error_code}, 详情: {exc.details}")
+    logger.error("API异常: %s, 错误码: %s, 详情: %s", exc.message, exc.error_code, exc.details)
     
     error_response = ErrorResponse(
         error=exc.message,
@@ -67,15 +73,15 @@ async def api_exception_handler(request: Request, exc: APIException) -> JSONResp
         details=exc.details
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
-        content=error_response.model_dump()
+        content=error_response.model_dump(mode="json")
     )
 
 
-async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
+async def http_exception_handler(request: Request, exc: HTTPException) -> ORJSONResponse:
     """HTTP异常处理器"""
-    logger.error(f"HTTP异常: {exc.detail}, 状态码: {exc.status_code}")
+    logger.error("HTTP异常: %s, 状态码: %s", exc.detail, exc.status_code)
     
     # 根据状态码确定错误码
     error_code_map = {
@@ -84,6 +90,7 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
         403: "FORBIDDEN", 
         404: "NOT_FOUND",
         422: "VALIDATION_ERROR",
+        429: "RATE_LIMITED",
         500: "INTERNAL_SERVER_ERROR"
     }
     
@@ -92,15 +99,16 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
         error_code=error_code_map.get(exc.status_code, "HTTP_ERROR")
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
-        content=error_response.model_dump()
+        content=error_response.model_dump(mode="json"),
+        headers=getattr(exc, "headers", None)
     )
 
 
-async def validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
+async def validation_exception_handler(request: Request, exc: RequestValidationError) -> ORJSONResponse:
     """数据验证异常处理器"""
-    logger.error(f"数据验证异常: {exc.errors()}")
+    logger.error("数据验证异常: %s", exc.errors())
     
     # 格式化验证错误信息
     validation_errors = []
@@ -118,13 +126,13 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         details={"validation_errors": validation_errors}
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
-        content=error_response.model_dump()
+        content=error_response.model_dump(mode="json")
     )
 
 
-async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError) -> JSONResponse:
+async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError) -> ORJSONResponse:
     """数据库异常处理器"""
     logger.error(f"数据库异常: {str(exc)}")
     logger.error(f"异常堆栈: {traceback.format_exc()}")
@@ -135,13 +143,13 @@ async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError) -
         details={"db_error": str(exc)} if logger.level <= logging.DEBUG else None
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
-        content=error_response.model_dump()
+        content=error_response.model_dump(mode="json")
     )
 
 
-async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+async def general_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
     """通用异常处理器"""
     logger.error(f"未处理的异常: {str(exc)}")
     logger.error(f"异常堆栈: {traceback.format_exc()}")
@@ -152,9 +160,9 @@ async def general_exception_handler(request: Request, exc: Exception) -> JSONRes
         details={"error": str(exc)} if logger.level <= logging.DEBUG else None
     )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
-        content=error_response.model_dump()
+        content=error_response.model_dump(mode="json")
     )
 
 
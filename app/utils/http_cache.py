@@ -0,0 +1,98 @@
+"""
+HTTP条件请求工具
+生成强/弱ETag，处理 If-None-Match / If-Modified-Since 并构造304响应
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+# 章节生成后内容不再变化，浏览器可永久缓存（仅限私有缓存，接口需要认证）
+CACHE_CONTROL_IMMUTABLE = "private, max-age=31536000, immutable"
+# 可变资源：允许缓存但每次使用前必须重新验证
+CACHE_CONTROL_REVALIDATE = "private, no-cache"
+
+
+def compute_digest(*parts) -> str:
+    """根据若干字段计算SHA-256摘要"""
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(str(part).encode("utf-8"))
+        hasher.update(b"\x1f")
+    return hasher.hexdigest()
+
+
+def strong_etag(digest: str) -> str:
+    """强ETag（内容逐字节一致）"""
+    return f'"{digest}"'
+
+
+def weak_etag(*parts) -> str:
+    """弱ETag（语义等价），由版本字段（更新时间、数量等）派生"""
+    return f'W/"{compute_digest(*parts)[:32]}"'
+
+
+def http_date(value: datetime) -> str:
+    """将数据库中的UTC时间格式化为HTTP日期"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value, usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match 使用弱比较"""
+    if header.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def has_conditional_headers(request: Request) -> bool:
+    """请求是否携带条件请求头"""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, etag: Optional[str], last_modified: Optional[datetime] = None) -> bool:
+    """判断客户端缓存是否仍然有效（If-None-Match 优先于 If-Modified-Since）"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return bool(etag) and _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            # "-0000" 时区解析为naive时间，按RFC 9110视为UTC
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def cache_headers(etag: Optional[str], last_modified: Optional[datetime] = None,
+                  cache_control: str = CACHE_CONTROL_REVALIDATE) -> Dict[str, str]:
+    """构造缓存相关响应头"""
+    headers = {"Cache-Control": cache_control}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    """304响应"""
+    return Response(status_code=304, headers=headers)
@@ -2,6 +2,7 @@ import jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import os
+import uuid
 
 # JWT配置
 JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
@@ -10,13 +11,15 @@ JWT_EXPIRATION_HOURS = 24 * 7  # 7天
 
 class JWTUtils:
     @staticmethod
-    def generate_token(user_id: str, username: str) -> str:
+    def generate_token(user_id: str, username: str, public_id: str = None, created_at: datetime = None) -> str:
         """
         生成JWT令牌
         
         Args:
             user_id: 用户ID
             username: 用户名
+            public_id: 用户登录ID（无状态认证时用于还原用户信息）
+            created_at: 用户创建时间（同上）
             
         Returns:
             JWT令牌字符串
@@ -24,9 +27,13 @@ class JWTUtils:
         payload = {
             'user_id': user_id,
             'username': username,
+            'jti': uuid.uuid4().hex,
             'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS),
             'iat': datetime.utcnow()
         }
+        if public_id and created_at:
+            payload['uid'] = public_id
+            payload['created_at'] = created_at.isoformat()
         
         return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
     
@@ -1,29 +1,164 @@
 """
 日志配置模块
 使用loguru进行日志管理，按天保存，保留最近三天的日志
+
+两种模式（LOG_MODE）：
+- development：彩色控制台 + 文本日志文件，异常附带变量值（diagnose）
+- production：每行一条JSON，所有输出经后台线程队列写入（enqueue），请求路径上不做文件IO；
+  关闭 diagnose，避免异常堆栈中泄露变量值并降低异常格式化开销
+
+两种模式都支持按模块设置日志级别（LOG_MODULE_LEVELS）和高频日志采样（LOG_SAMPLE_RATES、
+logger.bind(sample_rate=...)），标准库 logging 的输出（含uvicorn）统一转入loguru。
+日志消息请使用 logger.info("... {}", value) 的延迟格式化写法，级别被过滤时不会格式化参数。
 """
 
-import os
+import inspect
+import logging
+import random
 import sys
-from loguru import logger
+import traceback
 from pathlib import Path
+from typing import Dict, Optional
 
+import orjson
+from loguru import logger
+from opentelemetry import trace
 
-def setup_logger():
-    """
-    配置loguru日志系统
-    - 按天保存日志文件
-    - 保留最近3天的日志
-    - 控制台输出彩色日志
-    - 文件输出详细日志
-    """
-    # 移除默认的控制台处理器
-    logger.remove()
-    
-    # 创建日志目录
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
+from app.config import settings
+
+LEVEL_NO = {
+    "TRACE": 5, "DEBUG": 10, "INFO": 20, "SUCCESS": 25, "WARNING": 30, "ERROR": 40, "CRITICAL": 50
+}
+
+# 写入JSON时不重复输出的 extra 字段
+_RESERVED_EXTRA = {"name", "trace_id", "sample_rate", "_json"}
+
+
+def _add_trace_id(record):
+    """把当前span的trace id写入日志记录，便于从日志跳转到对应的链路"""
+    context = trace.get_current_span().get_span_context()
+    record["extra"]["trace_id"] = trace.format_trace_id(context.trace_id) if context.is_valid else "-"
+
+
+def _longest_prefix(name: str, table: Dict[str, object]) -> Optional[object]:
+    """按模块名最长前缀匹配配置项（"app.database" 同时作用于 "app.database.routing"）"""
+    best = None
+    best_length = -1
+    for prefix, value in table.items():
+        if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > best_length:
+            best, best_length = value, len(prefix)
+    return best
+
+
+class LogFilter:
+    """按模块级别过滤，并对WARNING以下的日志按比例采样"""
+
+    def __init__(self, default_level: str, module_levels: Dict[str, str], sample_rates: Dict[str, float]):
+        self.default_level = LEVEL_NO[default_level.upper()]
+        self.module_levels = {name: LEVEL_NO[level.upper()] for name, level in module_levels.items()}
+        self.sample_rates = sample_rates
+        self._cache: Dict[str, tuple] = {}
+
+    @property
+    def min_level(self) -> int:
+        """默认级别和各模块级别中最低的一个，用作sink级别，按模块的判断交给过滤器本身"""
+        return min([self.default_level, *self.module_levels.values()])
+
+    def _module_config(self, name: str) -> tuple:
+        config = self._cache.get(name)
+        if config is None:
+            level = _longest_prefix(name, self.module_levels)
+            rate = _longest_prefix(name, self.sample_rates)
+            config = (self.default_level if level is None else level, 1.0 if rate is None else rate)
+            self._cache[name] = config
+        return config
+
+    def __call__(self, record) -> bool:
+        level, rate = self._module_config(record["name"] or "")
+        if record["level"].no < level:
+            return False
+        if record["level"].no >= LEVEL_NO["WARNING"]:
+            return True
+        rate = record["extra"].get("sample_rate", rate)
+        return rate >= 1.0 or random.random() < rate
+
+
+def _json_format(record) -> str:
+    """把日志记录序列化为单行JSON（loguru格式函数返回模板，实际内容放入 extra）"""
+    payload = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+        "trace_id": record["extra"].get("trace_id", "-"),
+    }
+    extra = {key: value for key, value in record["extra"].items() if key not in _RESERVED_EXTRA}
+    if extra:
+        payload["extra"] = extra
+    if record["exception"] is not None:
+        exc_type, exc_value, exc_traceback = record["exception"]
+        payload["exception"] = {
+            "type": exc_type.__name__ if exc_type else None,
+            "value": str(exc_value),
+            # 堆栈放在JSON字段内，保证一条日志一行；只含代码位置，不含变量值
+            "traceback": "".join(traceback.format_exception(exc_type, exc_value, exc_traceback)),
+        }
+    record["extra"]["_json"] = orjson.dumps(payload, default=str).decode("utf-8")
+    return "{extra[_json]}\n"
+
+
+class InterceptHandler(logging.Handler):
+    """把标准库 logging 的记录转交给loguru，统一格式、级别和输出队列"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+
+        # 跳过 emit 自身和 logging 模块内部的栈帧，定位到真正调用 logging 的代码
+        frame, depth = inspect.currentframe(), 0
+        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
+            depth += 1
+
+        logger.patch(lambda r: r.update(name=record.name)).opt(
+            depth=depth, exception=record.exc_info
+        ).log(level, record.getMessage())
+
+
+class QuietPathsFilter(logging.Filter):
+    """丢弃探针和指标抓取的访问日志（高频且无信息量）"""
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = set(paths)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        args = record.args
+        if isinstance(args, tuple) and len(args) >= 3:
+            path = str(args[2]).split("?", 1)[0]
+            return path not in self.paths
+        return True
+
+
+def _intercept_stdlib_logging():
+    """标准库日志（应用内的 logging.getLogger 和 uvicorn）统一交给loguru处理"""
+    logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        std_logger = logging.getLogger(name)
+        std_logger.handlers = []
+        std_logger.propagate = True
+    logging.getLogger("uvicorn.access").addFilter(QuietPathsFilter(settings.log_quiet_paths))
+
+
+def _log_filter(default_level: str) -> LogFilter:
+    return LogFilter(default_level, settings.log_module_levels, settings.log_sample_rates)
+
+
+def _setup_development(log_dir: Path):
     # 控制台日志配置 - 生产环境简化输出
     console_format = (
         "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
@@ -31,30 +166,37 @@ def setup_logger():
         "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | "
         "<level>{message}</level>"
     )
-    
+
     # 文件日志配置 - 详细输出
     file_format = (
         "{time:YYYY-MM-DD HH:mm:ss.SSS} | "
         "{level: <8} | "
         "{name}:{function}:{line} | "
+        "trace={extra[trace_id]} | "
         "{message}"
     )
-    
+
+    # sink级别取最低的配置级别，否则 LOG_MODULE_LEVELS 无法把单个模块调得比默认级别更详细
+    console_filter = _log_filter("INFO")
+    file_filter = _log_filter("DEBUG")
+
     # 添加控制台处理器
     logger.add(
         sys.stdout,
         format=console_format,
-        level="INFO",
+        level=console_filter.min_level,
+        filter=console_filter,
         colorize=True,
         backtrace=True,
         diagnose=True
     )
-    
+
     # 添加文件处理器 - 按天轮转，保留3天
     logger.add(
         log_dir / "inkflow_{time:YYYY-MM-DD}.log",
         format=file_format,
-        level="DEBUG",
+        level=file_filter.min_level,
+        filter=file_filter,
         rotation="00:00",  # 每天午夜轮转
         retention="3 days",  # 保留3天
         compression="zip",  # 压缩旧日志
@@ -62,7 +204,7 @@ def setup_logger():
         backtrace=True,
         diagnose=True
     )
-    
+
     # 添加错误日志文件 - 只记录ERROR及以上级别
     logger.add(
         log_dir / "inkflow_error_{time:YYYY-MM-DD}.log",
@@ -75,13 +217,71 @@ def setup_logger():
         backtrace=True,
         diagnose=True
     )
-    
-    logger.info("日志系统初始化完成")
-    logger.info(f"日志目录: {log_dir.absolute()}")
-    
+
+
+def _setup_production(log_dir: Path):
+    log_filter = _log_filter(settings.log_level)
+
+    # 标准输出：交给容器日志采集
+    logger.add(
+        sys.stdout,
+        format=_json_format,
+        level=log_filter.min_level,
+        filter=log_filter,
+        colorize=False,
+        enqueue=True,  # 后台线程写出，调用方只做格式化和入队
+        backtrace=False,
+        diagnose=False
+    )
+
+    # 错误日志文件（JSON），便于事后排查
+    logger.add(
+        log_dir / "inkflow_error_{time:YYYY-MM-DD}.jsonl",
+        format=_json_format,
+        level="ERROR",
+        rotation="00:00",
+        retention="7 days",
+        compression="zip",
+        encoding="utf-8",
+        enqueue=True,
+        backtrace=False,
+        diagnose=False
+    )
+
+
+def setup_logger():
+    """
+    配置loguru日志系统
+    - 按天保存日志文件
+    - 保留最近3天的日志
+    - 开发模式控制台输出彩色日志、文件输出详细日志
+    - 生产模式输出JSON，经后台队列写出
+    """
+    # 移除默认的控制台处理器
+    logger.remove()
+    logger.configure(patcher=_add_trace_id)
+
+    # 创建日志目录
+    log_dir = Path("logs")
+    log_dir.mkdir(exist_ok=True)
+
+    if settings.log_mode == "production":
+        _setup_production(log_dir)
+    else:
+        _setup_development(log_dir)
+    _intercept_stdlib_logging()
+
+    logger.info("日志系统初始化完成，模式: {}", settings.log_mode)
+    logger.info("日志目录: {}", log_dir.absolute())
+
     return logger
 
 
+async def flush_logs():
+    """等待队列中的日志写出（进程退出前调用）"""
+    await logger.complete()
+
+
 # 全局日志实例
 app_logger = setup_logger()
 
@@ -89,10 +289,10 @@ app_logger = setup_logger()
 def get_logger(name: str = None):
     """
     获取日志实例
-    
+
     Args:
         name: 日志名称，通常使用模块名
-        
+
     Returns:
         logger实例
     """
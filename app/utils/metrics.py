@@ -0,0 +1,160 @@
+"""
+Prometheus指标
+- HTTP：按路由模板（而非原始路径）统计请求数和延迟，标签基数固定
+- 流式响应：活跃数和持续时间
+- 数据库连接池、Redis命令延迟、LLM调用（按任务和结果）
+
+多进程部署（多个uvicorn worker）时设置 METRICS_MULTIPROC_DIR（或 PROMETHEUS_MULTIPROC_DIR），
+各进程把指标写入该目录，/metrics 汇总所有进程的数据。目录需在启动前由部署脚本清空。
+"""
+
+import asyncio
+import functools
+import os
+import time
+
+from app.config import settings
+
+# 多进程模式必须在导入 prometheus_client 之前设置目录
+if settings.metrics_multiproc_dir:
+    os.makedirs(settings.metrics_multiproc_dir, exist_ok=True)
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.metrics_multiproc_dir)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STREAM_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP请求数", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP请求延迟（到响应头发出）", ["method", "route"],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "处理中的HTTP请求数", multiprocess_mode="livesum"
+)
+STREAMS_ACTIVE = Gauge(
+    "http_streams_active", "进行中的流式响应（SSE/NDJSON/导出）", ["route"], multiprocess_mode="livesum"
+)
+STREAM_DURATION = Histogram(
+    "http_stream_duration_seconds", "流式响应持续时间", ["route"], buckets=STREAM_BUCKETS
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "已借出的数据库连接数", ["engine"], multiprocess_mode="livesum"
+)
+DB_POOL_EVENTS = Counter(
+    "db_pool_events_total", "数据库连接池事件", ["engine", "event"]
+)
+
+REDIS_LATENCY = Histogram(
+    "redis_command_duration_seconds", "Redis命令延迟", ["command"], buckets=LATENCY_BUCKETS
+)
+REDIS_FAILURES = Counter(
+    "redis_command_failures_total", "Redis命令失败数", ["command", "reason"]
+)
+
+LLM_CALLS = Counter(
+    "llm_calls_total", "LLM调用次数", ["task", "outcome"]
+)
+LLM_DURATION = Histogram(
+    "llm_call_duration_seconds", "LLM调用耗时", ["task"], buckets=STREAM_BUCKETS
+)
+
+
+def render_metrics() -> bytes:
+    """生成Prometheus文本格式的指标（多进程模式下汇总所有worker）"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead():
+    """worker退出时清理其 live 类型的仪表数据"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def instrument_engine(engine, name: str):
+    """监听连接池事件，统计借出连接数和连接生命周期"""
+    from sqlalchemy import event
+
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        DB_POOL_EVENTS.labels(name, "connect").inc()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_EVENTS.labels(name, "checkout").inc()
+        checked_out.inc()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        DB_POOL_EVENTS.labels(name, "invalidate").inc()
+
+
+def llm_call(task: str):
+    """装饰LLM调用方法，统计耗时和结果（success / error / cancelled）"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "success"
+            try:
+                return await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                raise
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                LLM_CALLS.labels(task, outcome).inc()
+                LLM_DURATION.labels(task).observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def llm_stream(task: str):
+    """装饰流式LLM生成器：产出 {"type": "error"} 事件也记为 error，客户端断开记为 cancelled"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "success"
+            try:
+                async for chunk in func(*args, **kwargs):
+                    if isinstance(chunk, dict) and chunk.get("type") == "error":
+                        outcome = "error"
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                outcome = "cancelled"
+                raise
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                LLM_CALLS.labels(task, outcome).inc()
+                LLM_DURATION.labels(task).observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
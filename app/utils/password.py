@@ -1,10 +1,29 @@
 """
 密码哈希和验证工具
-使用bcrypt进行安全的密码哈希
+使用bcrypt进行安全的密码哈希；异步接口在独立的有界线程池中执行，避免阻塞事件循环
 """
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
 
+from app.config import settings
+
+# bcrypt计算期间会释放GIL，使用专用线程池即可并行且不占用默认线程池
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="password-hash"
+)
+# 限制排队中的哈希任务数量，登录风暴时多余的请求在事件循环中等待而不是无限堆积
+_hash_slots = asyncio.Semaphore(settings.password_hash_max_pending)
+
+
+async def _run_in_pool(func, *args):
+    async with _hash_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+
 
 class PasswordUtils:
     """密码工具类"""
@@ -21,7 +40,7 @@ class PasswordUtils:
             哈希后的密码字符串
         """
         # 生成盐值并哈希密码
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
     
@@ -45,6 +64,33 @@ class PasswordUtils:
         except Exception:
             return False
     
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        """
+        哈希的cost低于当前配置时需要重新哈希
+        
+        Args:
+            hashed_password: 哈希后的密码（格式 $2b$12$...）
+            
+        Returns:
+            是否需要升级
+        """
+        try:
+            rounds = int(hashed_password.split('$')[2])
+        except (IndexError, ValueError):
+            return False
+        return rounds < settings.bcrypt_rounds
+    
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """在密码哈希线程池中执行 hash_password"""
+        return await _run_in_pool(PasswordUtils.hash_password, password)
+    
+    @staticmethod
+    async def verify_password_async(password: str, hashed_password: str) -> bool:
+        """在密码哈希线程池中执行 verify_password"""
+        return await _run_in_pool(PasswordUtils.verify_password, password, hashed_password)
+    
     @staticmethod
     def is_strong_password(password: str) -> tuple[bool, str]:
         """
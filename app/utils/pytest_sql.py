@@ -0,0 +1,27 @@
+"""
+SQL查询预算的pytest插件
+在 conftest.py 中加入 pytest_plugins = ["app.utils.pytest_sql"] 后即可使用：
+
+    def test_list_stories(client, query_budget):
+        with query_budget(max_queries=3, max_repeats=1):
+            client.get("/api/v1/stories/")
+
+TestClient 在独立线程中运行应用，因此预算按 global_scope 统计进程内的所有语句。
+"""
+
+import functools
+
+import pytest
+
+from app.database import engine
+from app.database.connection import replica_engines
+from app.utils.sql_profiler import profile_engine, query_budget as _query_budget
+
+
+@pytest.fixture
+def query_budget():
+    """返回 query_budget 上下文管理器，超出预算时抛出 QueryBudgetExceeded（AssertionError 子类）"""
+    profile_engine(engine)
+    for replica in replica_engines:
+        profile_engine(replica)
+    return functools.partial(_query_budget, global_scope=True)
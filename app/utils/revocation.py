@@ -0,0 +1,192 @@
+"""
+令牌吊销列表
+无状态认证模式下不再逐请求查询用户表，停用用户和吊销的令牌记录在Redis有序集合中
+（分数为条目过期时间），并定期镜像为进程内布隆过滤器：
+- 布隆过滤器未命中（绝大多数请求）：纯CPU判断，无网络I/O
+- 命中：可能是假阳性，再查询Redis确认
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+from app.database import async_redis
+from .bloom import BloomFilter
+from .jwt_utils import JWT_EXPIRATION_HOURS
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+REVOCATION_KEY = "auth:revoked"
+# 停用用户的吊销记录需要保留到其所有已签发令牌过期
+USER_REVOCATION_TTL = JWT_EXPIRATION_HOURS * 3600
+# 超过该数量的刷新周期未成功同步时，布隆过滤器视为过期，不再据其判定"未吊销"
+STALE_REFRESH_INTERVALS = 2
+
+_MISSING = object()
+
+
+def _user_member(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def _token_member(jti: str) -> str:
+    return f"jti:{jti}"
+
+
+class RevocationList:
+    """Redis吊销集合 + 进程内布隆过滤器镜像"""
+
+    def __init__(self):
+        self._bloom = BloomFilter(settings.auth_bloom_capacity, settings.auth_bloom_error_rate)
+        self._refreshed_at: Optional[float] = None
+        # 尚未写入Redis的变更：成员 -> 过期时间（None 表示移除），写入失败时保留并在后台重试
+        self._pending: Dict[str, Optional[float]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def fresh(self) -> bool:
+        """布隆过滤器是否在最近几个刷新周期内与Redis同步过"""
+        if self._refreshed_at is None:
+            return False
+        max_age = settings.auth_revocation_refresh_seconds * STALE_REFRESH_INTERVALS
+        return time.monotonic() - self._refreshed_at <= max_age
+
+    async def refresh(self):
+        """清理过期条目并重建布隆过滤器"""
+        now = time.time()
+
+        def build(pipe):
+            pipe.zremrangebyscore(REVOCATION_KEY, "-inf", now)
+            pipe.zrange(REVOCATION_KEY, 0, -1)
+
+        result = await async_redis.pipeline(build, command="REVOCATION_REFRESH")
+        if result is None:
+            return
+
+        bloom = BloomFilter(max(settings.auth_bloom_capacity, len(result[1])), settings.auth_bloom_error_rate)
+        for member in result[1]:
+            bloom.add(member)
+        with self._lock:
+            # 尚未写入Redis的吊销同样需要命中
+            for member, expires_at in self._pending.items():
+                if expires_at is not None:
+                    bloom.add(member)
+        self._bloom = bloom
+        self._refreshed_at = time.monotonic()
+
+    async def flush_pending(self) -> bool:
+        """把待写入的变更一次性写入Redis，失败时保留等待下次重试"""
+        with self._lock:
+            pending = dict(self._pending)
+        if not pending:
+            return True
+
+        def build(pipe):
+            for member, expires_at in pending.items():
+                if expires_at is None:
+                    pipe.zrem(REVOCATION_KEY, member)
+                else:
+                    pipe.zadd(REVOCATION_KEY, {member: expires_at})
+
+        if await async_redis.pipeline(build, transaction=True, command="REVOCATION_WRITE") is None:
+            logger.warning("写入吊销列表失败，{} 条变更等待重试", len(pending))
+            return False
+
+        with self._lock:
+            for member, expires_at in pending.items():
+                # 期间又有新变更的成员保留，由下次写入
+                if self._pending.get(member, _MISSING) == expires_at:
+                    del self._pending[member]
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await self.flush_pending()
+                if settings.auth_stateless:
+                    await self.refresh()
+            except Exception as e:
+                logger.error("刷新吊销列表失败: {}", e)
+            await asyncio.sleep(settings.auth_revocation_refresh_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush_pending()
+
+    async def is_revoked(self, user_id: str, jti: Optional[str] = None) -> Optional[bool]:
+        """判断令牌是否被吊销；布隆过滤器未同步或Redis不可用而无法确认时返回None（由调用方查询数据库）"""
+        members = [_user_member(user_id)]
+        if jti:
+            members.append(_token_member(jti))
+
+        # 本进程刚提交、尚未写入Redis的变更优先
+        now = time.time()
+        unresolved = []
+        for member in members:
+            expires_at = self._pending.get(member, _MISSING)
+            if expires_at is _MISSING:
+                unresolved.append(member)
+            elif expires_at is not None and expires_at > now:
+                return True
+
+        if not unresolved:
+            return False
+        if not self.fresh:
+            return None
+
+        candidates = [member for member in unresolved if member in self._bloom]
+        if not candidates:
+            return False
+
+        # 布隆过滤器命中，向Redis确认（排除假阳性和已恢复的用户）
+        for member in candidates:
+            score = await async_redis.command("ZSCORE", REVOCATION_KEY, member, default=_MISSING)
+            if score is _MISSING:
+                return None
+            if score is not None and float(score) > time.time():
+                return True
+        return False
+
+    def revoke_user(self, user_id: str):
+        """吊销用户的所有令牌（用户停用的事务提交后调用，可在同步代码中执行）"""
+        self._enqueue(_user_member(user_id), time.time() + USER_REVOCATION_TTL)
+
+    def restore_user(self, user_id: str):
+        """用户重新启用（布隆过滤器无法删除，命中后由Redis确认）"""
+        self._enqueue(_user_member(user_id), None)
+
+    def revoke_token(self, jti: str, expires_at: float):
+        """吊销单个令牌，记录保留到令牌过期"""
+        self._enqueue(_token_member(jti), expires_at)
+
+    def _enqueue(self, member: str, expires_at: Optional[float]):
+        """记录变更并尽快经异步客户端写入Redis（不阻塞调用方）"""
+        with self._lock:
+            self._pending[member] = expires_at
+        if expires_at is not None:
+            self._bloom.add(member)
+
+        try:
+            asyncio.get_running_loop().create_task(self.flush_pending())
+            return
+        except RuntimeError:
+            pass
+        # 同步路由在线程池中执行：提交到主事件循环
+        if self._loop is not None and not self._loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self.flush_pending(), self._loop)
+
+
+# 全局吊销列表
+revocation_list = RevocationList()
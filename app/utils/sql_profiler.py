@@ -0,0 +1,186 @@
+"""
+SQL语句分析器
+- 通过SQLAlchemy游标事件统计每个请求的语句数、数据库总耗时和最慢的语句
+- 语句按"形状"归并（去掉字面量、参数占位符和IN列表长度），同一形状在一个请求内重复多次即为N+1嫌疑
+- 统计结果保存在上下文变量中，请求结束时由中间件写入响应头或日志；测试中可用 query_budget 断言查询预算
+- 嵌套统计时内层语句同时计入外层；global_scope 模式统计进程内所有线程的语句（测试客户端在独立线程运行请求）
+"""
+
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from app.config import settings
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|(?<!:):\w+")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+_current_profile: ContextVar[Optional["QueryProfile"]] = ContextVar("sql_query_profile", default=None)
+_global_profiles: List["QueryProfile"] = []
+_profiled_engines: Set[int] = set()
+
+
+def normalize_statement(statement: str) -> str:
+    """把SQL语句归一化为形状：字面量和参数替换为 ?，IN列表折叠为 IN (...)"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class ShapeStats:
+    count: int = 0
+    total_time: float = 0.0
+
+
+@dataclass
+class QueryProfile:
+    """单个请求（或代码块）内的SQL统计"""
+
+    count: int = 0
+    total_time: float = 0.0
+    shapes: Dict[str, ShapeStats] = field(default_factory=dict)
+    slowest: List[Tuple[float, str]] = field(default_factory=list)
+    slowest_limit: int = 5
+    parent: Optional["QueryProfile"] = field(default=None, repr=False)
+
+    def record(self, statement: str, elapsed: float, shape: Optional[str] = None):
+        shape = shape or normalize_statement(statement)
+        if self.parent is not None:
+            self.parent.record(statement, elapsed, shape)
+        self.count += 1
+        self.total_time += elapsed
+        stats = self.shapes.setdefault(shape, ShapeStats())
+        stats.count += 1
+        stats.total_time += elapsed
+
+        if len(self.slowest) < self.slowest_limit or elapsed > self.slowest[-1][0]:
+            self.slowest.append((elapsed, shape))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[self.slowest_limit:]
+
+    def repeated_shapes(self, threshold: int) -> Dict[str, int]:
+        """在本次统计中执行次数超过阈值的语句形状（N+1嫌疑）"""
+        return {shape: stats.count for shape, stats in self.shapes.items() if stats.count > threshold}
+
+    def server_timing(self) -> str:
+        """Server-Timing 响应头的值，浏览器开发者工具可直接展示"""
+        return f'db;dur={self.total_time * 1000:.1f};desc="{self.count} queries"'
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_time * 1000, 2),
+            "slowest": [{"ms": round(elapsed * 1000, 2), "statement": shape} for elapsed, shape in self.slowest]
+        }
+
+
+class QueryBudgetExceeded(AssertionError):
+    """代码块内的SQL语句数超出预算"""
+
+
+def current_profile() -> Optional[QueryProfile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_queries(global_scope: bool = False) -> Iterator[QueryProfile]:
+    """
+    在代码块内统计SQL语句
+
+    Args:
+        global_scope: 为True时统计进程内所有线程执行的语句，而不仅是当前上下文
+    """
+    profile = QueryProfile(slowest_limit=settings.sql_profiler_slowest)
+    if global_scope:
+        _global_profiles.append(profile)
+        try:
+            yield profile
+        finally:
+            _global_profiles.remove(profile)
+        return
+
+    profile.parent = _current_profile.get()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+@contextmanager
+def query_budget(
+    max_queries: int, max_repeats: Optional[int] = None, global_scope: bool = False
+) -> Iterator[QueryProfile]:
+    """
+    断言代码块内的SQL语句数不超过预算
+
+    Args:
+        max_queries: 允许的最大语句数
+        max_repeats: 同一语句形状允许的最大执行次数，用于捕获N+1
+        global_scope: 统计所有线程的语句（见 profile_queries）
+    """
+    with profile_queries(global_scope) as profile:
+        yield profile
+
+    if profile.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"执行了 {profile.count} 条SQL，超出预算 {max_queries}\n" + _format_shapes(profile.shapes)
+        )
+    if max_repeats is not None:
+        repeated = profile.repeated_shapes(max_repeats)
+        if repeated:
+            raise QueryBudgetExceeded(
+                f"同一语句重复执行超过 {max_repeats} 次（疑似N+1）\n"
+                + "\n".join(f"  {count}x {shape}" for shape, count in repeated.items())
+            )
+
+
+def _format_shapes(shapes: Dict[str, ShapeStats]) -> str:
+    ordered = sorted(shapes.items(), key=lambda item: item[1].count, reverse=True)
+    return "\n".join(f"  {stats.count}x {shape}" for shape, stats in ordered)
+
+
+def profile_engine(engine):
+    """监听游标事件，把每条语句的耗时记入当前统计（不在统计范围内时几乎无开销），重复调用无副作用"""
+    from sqlalchemy import event
+
+    if id(engine) in _profiled_engines:
+        return
+    _profiled_engines.add(id(engine))
+
+    def active() -> bool:
+        return _current_profile.get() is not None or bool(_global_profiles)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if active():
+            conn.info.setdefault("sql_profiler_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("sql_profiler_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        shape = normalize_statement(statement)
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.record(statement, elapsed, shape)
+        for global_profile in list(_global_profiles):
+            global_profile.record(statement, elapsed, shape)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get("sql_profiler_start") if conn is not None else None
+        if starts:
+            starts.pop()
@@ -0,0 +1,178 @@
+"""
+分布式追踪（OpenTelemetry）
+- HTTP请求（ASGI中间件，支持 traceparent 传播）、服务方法、SQL语句、Redis命令、LLM调用各自生成span
+- 流式生成的每个数据块记录为span事件
+- 导出器可选控制台或本地文件（每行一个span的JSON），无需外部采集服务即可离线分析
+
+未启用时使用OpenTelemetry API的空实现，开销可以忽略。
+"""
+
+import functools
+import inspect
+import os
+import sys
+from typing import Any, Optional
+
+from opentelemetry import trace
+from opentelemetry.trace import Status, StatusCode
+
+from app.config import settings
+
+tracer = trace.get_tracer("inkflow")
+
+
+def setup_tracing():
+    """按配置初始化TracerProvider和导出器"""
+    if not settings.tracing_enabled:
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.tracing_service_name}))
+    if settings.tracing_exporter == "file":
+        os.makedirs(os.path.dirname(settings.tracing_file) or ".", exist_ok=True)
+        out = open(settings.tracing_file, "a", encoding="utf-8")
+        exporter = ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+    else:
+        exporter = ConsoleSpanExporter(out=sys.stdout)
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+def current_trace_id() -> Optional[str]:
+    """当前上下文的trace id（十六进制），不在span内时返回None"""
+    context = trace.get_current_span().get_span_context()
+    if not context.is_valid:
+        return None
+    return trace.format_trace_id(context.trace_id)
+
+
+def _record_error(span, error: BaseException):
+    span.record_exception(error)
+    span.set_status(Status(StatusCode.ERROR, str(error)))
+
+
+def _chunk_event(span, chunk: Any):
+    """将流式数据块记录为span事件（只记录类型和长度，不记录正文）"""
+    if isinstance(chunk, dict):
+        attributes = {"type": str(chunk.get("type", ""))}
+        content = chunk.get("content")
+        if isinstance(content, str):
+            attributes["chars"] = len(content)
+        span.add_event("stream.chunk", attributes)
+    else:
+        span.add_event("stream.chunk")
+
+
+def traced(name: str = None):
+    """为同步函数、协程、生成器和异步生成器创建span"""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def agen_wrapper(*args, **kwargs):
+                # 生成器跨越多次调度，span不作为全局当前span，只在每次取值期间激活
+                span = tracer.start_span(span_name)
+                generator = func(*args, **kwargs)
+                try:
+                    while True:
+                        with trace.use_span(span, end_on_exit=False):
+                            try:
+                                chunk = await generator.__anext__()
+                            except StopAsyncIteration:
+                                break
+                        _chunk_event(span, chunk)
+                        yield chunk
+                except BaseException as e:
+                    if not isinstance(e, GeneratorExit):
+                        _record_error(span, e)
+                    await generator.aclose()
+                    raise
+                finally:
+                    span.end()
+            return agen_wrapper
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def gen_wrapper(*args, **kwargs):
+                span = tracer.start_span(span_name)
+                generator = func(*args, **kwargs)
+                try:
+                    while True:
+                        with trace.use_span(span, end_on_exit=False):
+                            try:
+                                item = next(generator)
+                            except StopIteration:
+                                break
+                        yield item
+                except BaseException as e:
+                    if not isinstance(e, GeneratorExit):
+                        _record_error(span, e)
+                    generator.close()
+                    raise
+                finally:
+                    span.end()
+            return gen_wrapper
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(span_name):
+                return func(*args, **kwargs)
+        return sync_wrapper
+
+    return decorator
+
+
+def trace_class(cls):
+    """类装饰器：为所有公开方法创建span，span名为 类名.方法名"""
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("_"):
+            continue
+        span_name = f"{cls.__name__}.{attr}"
+        if isinstance(value, staticmethod):
+            setattr(cls, attr, staticmethod(traced(span_name)(value.__func__)))
+        elif isinstance(value, classmethod):
+            setattr(cls, attr, classmethod(traced(span_name)(value.__func__)))
+        elif inspect.isfunction(value):
+            setattr(cls, attr, traced(span_name)(value))
+    return cls
+
+
+def trace_engine(engine, name: str):
+    """为每条SQL语句创建span"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = tracer.start_span("db.query", attributes={
+            "db.system": engine.dialect.name,
+            "db.engine": name,
+            "db.statement": statement[:settings.tracing_statement_max_length]
+        })
+        conn.info.setdefault("tracing_spans", []).append(span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("tracing_spans")
+        if spans:
+            spans.pop().end()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("tracing_spans") if conn is not None else None
+        if spans:
+            span = spans.pop()
+            _record_error(span, exception_context.original_exception)
+            span.end()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+响应压缩基准测试
+对一章典型的中文正文（UTF-8下每字3字节）测量各编码的：
+- 完整响应：压缩率和每章压缩耗时
+- SSE流式：按事件刷新压缩器后的总字节数（刷新会降低压缩率，换取零延迟）
+
+未安装 brotli / zstandard 时对应编码自动跳过。
+用法: uv run python benchmarks/compression.py [章节字数] [重复次数]
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.middleware.compression import available_encodings  # noqa: E402
+
+SAMPLE = (
+    "夜色如墨，山门外的石阶被雨水洗得发亮。林青握着那柄锈迹斑斑的长剑，"
+    "听见远处传来钟声，一声接着一声，仿佛在催促着什么。"
+    "他想起师父临终前的嘱托，心中一阵酸楚，却仍旧迈步向前。\n"
+)
+
+
+def build_chapter(chars: int) -> str:
+    text = SAMPLE * (chars // len(SAMPLE) + 1)
+    return text[:chars]
+
+
+def build_sse_events(content: str, event_chars: int = 20):
+    for i in range(0, len(content), event_chars):
+        event = {"type": "content", "content": content[i:i + event_chars]}
+        yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def measure_whole(factory, body: bytes, repeat: int):
+    timings, size = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compressor = factory()
+        data = compressor.compress(body) + compressor.finish()
+        timings.append(time.perf_counter() - start)
+        size = len(data)
+    return size, statistics.median(timings)
+
+
+def measure_stream(factory, events):
+    compressor = factory()
+    total = 0
+    start = time.perf_counter()
+    for event in events:
+        total += len(compressor.compress(event) + compressor.flush())
+    total += len(compressor.finish())
+    return total, time.perf_counter() - start
+
+
+def main():
+    chars = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    content = build_chapter(chars)
+    body = json.dumps({"success": True, "data": {"content": content}}, ensure_ascii=False).encode("utf-8")
+    events = list(build_sse_events(content))
+    stream_size = sum(len(event) for event in events)
+
+    print(f"chapter: {chars} chars, JSON body {len(body)} B, SSE {len(events)} events / {stream_size} B")
+    for name, factory in available_encodings().items():
+        size, elapsed = measure_whole(factory, body, repeat)
+        sse_size, sse_elapsed = measure_stream(factory, events)
+        print(
+            f"{name:>5}: whole {size:7d} B ({size / len(body):6.1%}) {elapsed * 1000:7.3f} ms/chapter | "
+            f"SSE {sse_size:7d} B ({sse_size / stream_size:6.1%}) {sse_elapsed * 1000:7.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+日志开销基准测试
+模拟一个典型请求的日志调用（1条INFO、3条被过滤的DEBUG、按比例采样的高频INFO），
+测量每个请求在调用方线程上花费的日志时间：
+- development:  彩色文本 + 同步写文件，diagnose开启，f-string 消息（旧写法）
+- production:   JSON + enqueue 后台写出，diagnose关闭，延迟格式化消息
+- prod+sample:  在 production 基础上对高频日志按 10% 采样
+
+输出写入临时目录，不占用终端。
+用法: uv run python benchmarks/logging_overhead.py [请求数]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger  # noqa: E402
+
+from app.utils.logger import LogFilter, _json_format  # noqa: E402
+
+TEXT_FORMAT = (
+    "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} | "
+    "trace={extra[trace_id]} | {message}"
+)
+
+STORY = {"title": "雨夜山门", "current_chapter_number": 12, "chapters": list(range(50))}
+
+log_sample_rate = 1.0
+
+
+def request_eager(log):
+    log.info(f"开始流式生成章节 - 故事: {STORY['title']}, 章节: {STORY['current_chapter_number']}")
+    for i in range(3):
+        log.debug(f"缓存查询: story:{STORY['title']}:{i}, 数据: {STORY}")
+    log.info(f"缓存命中: story:{STORY['title']}")
+
+
+def request_lazy(log):
+    log.info("开始流式生成章节 - 故事: {}, 章节: {}", STORY["title"], STORY["current_chapter_number"])
+    for i in range(3):
+        log.debug("缓存查询: story:{}:{}, 数据: {}", STORY["title"], i, STORY)
+    log.bind(sample_rate=log_sample_rate).info("缓存命中: story:{}", STORY["title"])
+
+
+def configure(mode: str, directory: str):
+    global log_sample_rate
+    logger.remove()
+    log_filter = LogFilter("DEBUG" if mode == "development" else "INFO", {}, {})
+    if mode == "development":
+        logger.add(os.path.join(directory, "console.log"), format=TEXT_FORMAT, level="INFO",
+                   filter=log_filter, colorize=True, backtrace=True, diagnose=True)
+        logger.add(os.path.join(directory, "app.log"), format=TEXT_FORMAT, level="DEBUG",
+                   filter=log_filter, backtrace=True, diagnose=True)
+        return request_eager
+
+    logger.add(os.path.join(directory, "app.jsonl"), format=_json_format, level="INFO",
+               filter=log_filter, enqueue=True, backtrace=False, diagnose=False)
+    log_sample_rate = 0.1 if mode == "prod+sample" else 1.0
+    return request_lazy
+
+
+def measure(mode: str, requests: int, directory: str) -> float:
+    handler = configure(mode, directory)
+    log = logger.bind(name="benchmark")
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        handler(log)
+        timings.append(time.perf_counter() - start)
+    logger.complete()
+    return statistics.median(timings)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as directory:
+        results = {mode: measure(mode, requests, directory) for mode in ("development", "production", "prod+sample")}
+    logger.remove()
+
+    baseline = results["development"]
+    print(f"requests: {requests}")
+    for mode, elapsed in results.items():
+        print(f"{mode:>12}: {elapsed * 1e6:8.1f} us/request ({elapsed / baseline:6.1%} of development)")
+
+
+if __name__ == "__main__":
+    main()
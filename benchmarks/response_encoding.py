@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+响应编码基准测试
+测量大章节列表的单次响应编码耗时：
+- legacy: 逐项 .dict() 后放入 Dict[str, Any]，再经 jsonable_encoder + 标准库json（旧实现）
+- typed:  类型化响应模型，序列化一次后由 orjson 编码（ORJSONResponse）
+
+用法: uv run python benchmarks/response_encoding.py [章节数] [重复次数]
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import Field  # noqa: E402
+
+from app.models.responses import ChapterDetail, ChaptersListResponse, SuccessResponse  # noqa: E402
+
+
+class LegacyChaptersListResponse(SuccessResponse):
+    """旧版章节列表响应：data 为无类型字典"""
+    data: Dict[str, Any] = Field(default_factory=dict)
+
+
+def build_chapters(count: int):
+    story_id = str(uuid.uuid4())
+    content = "山风卷起衣袂，少年握紧了手中的剑。" * 150
+    chapters = [
+        ChapterDetail(
+            id=str(uuid.uuid4()),
+            story_id=story_id,
+            chapter_number=i + 1,
+            title=f"第{i + 1}章",
+            content=content,
+            summary=content[:200],
+            created_at=datetime.now()
+        )
+        for i in range(count)
+    ]
+    return story_id, chapters
+
+
+def encode_legacy(story_id, chapters) -> bytes:
+    response = LegacyChaptersListResponse(
+        data={"story_id": story_id, "chapters": [chapter.model_dump() for chapter in chapters]}
+    )
+    return json.dumps(jsonable_encoder(response), ensure_ascii=False).encode("utf-8")
+
+
+def encode_typed(story_id, chapters) -> bytes:
+    response = ChaptersListResponse.create(story_id=story_id, chapters=chapters)
+    return orjson.dumps(response.model_dump(mode="json"))
+
+
+def measure(name, encode, story_id, chapters, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode(story_id, chapters)
+        timings.append(time.perf_counter() - start)
+    print(
+        f"{name:>6}: median {statistics.median(timings) * 1000:8.2f} ms | "
+        f"min {min(timings) * 1000:8.2f} ms | body {len(body) / 1024:8.1f} KiB"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    story_id, chapters = build_chapters(count)
+    print(f"{count} chapters, {repeat} runs")
+    measure("legacy", encode_legacy, story_id, chapters, repeat)
+    measure("typed", encode_typed, story_id, chapters, repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,16 +6,26 @@ InkFlow AI - AI交互式小说平台
 
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.api import stories_router, chapters_router, auth_router
-from app.database import engine, Base, is_redis_connected, create_tables
+from app.database import engine, Base, create_tables, async_redis
+from app.database.connection import replica_engines
 from app.utils.exceptions import register_exception_handlers
-from app.models.responses import HealthCheckResponse, RootResponse
-from app.utils.logger import get_logger
+from app.middleware import CompressionMiddleware, MetricsMiddleware, SQLProfilerMiddleware, TracingMiddleware
+from app.models.responses import HealthCheckResponse, ProbeResponse, RootResponse
+from app.services.cache_service import dto_cache
+from app.services.health_service import health_monitor
+from app.utils.revocation import revocation_list
+from app.utils.logger import flush_logs, get_logger
+from app.utils.metrics import CONTENT_TYPE_LATEST, instrument_engine, mark_process_dead, render_metrics
+from app.utils.sql_profiler import profile_engine
+from app.utils.tracing import setup_tracing, trace_engine
 
-# 初始化日志
+# 初始化日志和链路追踪
 logger = get_logger(__name__)
+setup_tracing()
 
 # 创建数据库表
 logger.info("正在初始化数据库表...")
@@ -27,7 +37,8 @@ logger.info("正在创建FastAPI应用...")
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
-    debug=settings.debug
+    debug=settings.debug,
+    default_response_class=ORJSONResponse  # orjson原生处理datetime/UUID，编码速度远快于标准库json
 )
 logger.info(f"FastAPI应用创建完成: {settings.app_name} v{settings.app_version}")
 
@@ -45,6 +56,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩（流式响应按SSE事件边界刷新）
+if settings.compression_enabled:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
+
+# SQL分析（按请求统计语句数和耗时，调试模式下检测N+1）
+if settings.sql_profiler_enabled:
+    app.add_middleware(SQLProfilerMiddleware)
+    profile_engine(engine)
+    for replica in replica_engines:
+        profile_engine(replica)
+
+# 监控指标（统计包含压缩在内的完整耗时）
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine, "primary")
+    for index, replica in enumerate(replica_engines):
+        instrument_engine(replica, f"replica{index}")
+
+# 链路追踪（最外层，从请求头继承上游trace上下文）
+if settings.tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+    trace_engine(engine, "primary")
+    for index, replica in enumerate(replica_engines):
+        trace_engine(replica, f"replica{index}")
+
 # 注册路由 - 添加版本控制
 logger.info("正在注册API路由...")
 app.include_router(auth_router, prefix=settings.api_prefix)
@@ -52,6 +88,22 @@ app.include_router(stories_router, prefix=settings.api_prefix)
 app.include_router(chapters_router, prefix=settings.api_prefix)
 logger.info(f"API路由注册完成，前缀: {settings.api_prefix}")
 
+@app.on_event("startup")
+async def start_health_monitor():
+    """启动后台依赖检查和吊销列表同步"""
+    health_monitor.start()
+    # 吊销写入的重试始终运行；布隆过滤器刷新仅在无状态认证模式下进行
+    revocation_list.start()
+
+@app.on_event("shutdown")
+async def close_redis_pool():
+    """停止后台任务并关闭Redis连接池"""
+    await health_monitor.stop()
+    await revocation_list.stop()
+    await async_redis.close()
+    mark_process_dead()
+    await flush_logs()
+
 @app.get("/", response_model=RootResponse)
 async def root() -> RootResponse:
     """根路径"""
@@ -63,21 +115,39 @@ async def root() -> RootResponse:
 
 @app.get("/health", response_model=HealthCheckResponse)
 async def health_check() -> HealthCheckResponse:
-    """健康检查"""
-    logger.debug("执行健康检查...")
-    redis_status = is_redis_connected()
-
-    status = "healthy" if redis_status else "degraded"
-    logger.info(f"健康检查完成 - 状态: {status}, Redis: {'连接' if redis_status else '断开'}")
-
+    """健康检查（返回后台检查的缓存结果）"""
+    snapshot = health_monitor.snapshot()
     return HealthCheckResponse(
-        status=status,
+        status=snapshot["status"],
         version=settings.app_version,
-        services={
-            "database": "connected",
-            "redis": "connected" if redis_status else "disconnected"
-        }
+        services=snapshot["services"],
+        checked_at=snapshot["checked_at"],
+        cache=dto_cache.stats(),
+        redis=async_redis.stats()
+    )
+
+@app.get("/health/live", response_model=ProbeResponse)
+async def liveness_probe() -> ProbeResponse:
+    """存活探针：进程能够处理请求即返回成功"""
+    return ProbeResponse(status="alive")
+
+@app.get("/health/ready", response_model=ProbeResponse)
+async def readiness_probe():
+    """就绪探针：依据后台检查结果判断能否接收流量，不在请求中访问依赖"""
+    probe = ProbeResponse(
+        status="ready" if health_monitor.ready else "not_ready",
+        checked_at=health_monitor.checked_at
     )
+    if not health_monitor.ready:
+        return ORJSONResponse(status_code=503, content=probe.model_dump(mode="json"))
+    return probe
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus指标（多worker部署时汇总所有进程）"""
+    if not settings.metrics_enabled:
+        return Response(status_code=404)
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 if __name__ == "__main__":
     logger.info("启动InkFlow AI服务器...")
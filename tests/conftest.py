@@ -0,0 +1,125 @@
+"""
+测试公共配置
+- 导入应用前通过环境变量切换到临时SQLite数据库（环境变量优先于 .env）
+- Redis 替换为进程内的 fakeredis（含Lua脚本支持），每个测试使用独立实例
+- 加载SQL查询预算插件（提供 query_budget fixture）
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+_TEST_DIR = tempfile.mkdtemp(prefix="inkflow-test-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}",
+    "DATABASE_REPLICA_URLS": "[]",
+    "REDIS_URL": "redis://localhost:6379/15",
+    "API_PREFIX": "/api/v1",
+    "GEMINI_API_KEY": "",
+    "SECRET_KEY": "test-secret-key",
+    "BCRYPT_ROUNDS": "4",
+})
+
+import fakeredis  # noqa: E402
+import pytest  # noqa: E402
+
+pytest_plugins = ["app.utils.pytest_sql"]
+
+
+@pytest.fixture(autouse=True)
+def fake_redis():
+    """把异步客户端和同步兼容层都指向新的 fakeredis 实例，返回异步客户端"""
+    from app.database import async_redis
+    from app.database.redis_connection import redis_connection
+
+    server = fakeredis.FakeServer()
+    async_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    original = async_redis.client
+    async_redis.client = async_client
+    async_redis._scripts.clear()
+    async_redis._unavailable_until = 0.0
+    async_redis._loop = None
+    redis_connection.redis_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    redis_connection._unavailable_until = 0.0
+    try:
+        yield async_client
+    finally:
+        async_redis.client = original
+        async_redis._scripts.clear()
+        async_redis._loop = None
+        redis_connection.redis_client = None
+
+
+@pytest.fixture
+def app():
+    from main import app
+    return app
+
+
+@pytest.fixture
+def client(app):
+    """不触发启动事件（健康检查、吊销列表同步等后台任务）的测试客户端"""
+    from fastapi.testclient import TestClient
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def tables():
+    from app.database import create_tables
+    create_tables()
+
+
+@pytest.fixture
+def db(tables):
+    from app.database import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    from app.models import User
+
+    suffix = os.urandom(4).hex()
+    user = User(username=f"reader_{suffix}", user_id=suffix[:8], password_hash="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    from app.utils.jwt_utils import JWTUtils
+
+    token = JWTUtils.generate_token(user.id, user.username, user.user_id, user.created_at)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def story_factory(db):
+    """创建带世界观、章节和选择项的故事"""
+    from app.models import Chapter, Choice, Story, WorldView
+    from app.models.story import StoryStyle
+
+    def create(user, chapters: int = 3, choices: int = 3) -> Story:
+        story = Story(title="雨夜山门", style=StoryStyle.XIANXIA, user_id=user.id,
+                      current_chapter_number=chapters)
+        db.add(story)
+        db.flush()
+        db.add(WorldView(story_id=story.id, world_setting="九州"))
+        start = datetime.utcnow() - timedelta(hours=chapters)
+        for number in range(1, chapters + 1):
+            chapter = Chapter(story_id=story.id, chapter_number=number, title=f"第{number}章",
+                              content="正文" * 50, summary=f"摘要{number}",
+                              created_at=start + timedelta(hours=number))
+            db.add(chapter)
+            db.flush()
+            for index in range(choices):
+                db.add(Choice(chapter_id=chapter.id, choice_text=f"选项{index}"))
+        db.commit()
+        return story
+
+    return create
@@ -0,0 +1,249 @@
+"""DTO读穿缓存与缓存击穿保护"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.config import settings
+from app.database import async_redis
+from app.services import cache_service
+from app.services.cache_service import DTOCache
+
+
+@pytest.fixture
+def cache():
+    return DTOCache(prefix="test")
+
+
+class Loader:
+    """记录回源次数的同步加载函数"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+async def test_miss_then_hit(cache):
+    loader = Loader({"title": "雨夜山门"})
+
+    assert await cache.get_or_load("story", "1", loader, ttl=60) == {"title": "雨夜山门"}
+    assert await cache.get_or_load("story", "1", loader, ttl=60) == {"title": "雨夜山门"}
+
+    assert loader.calls == 1
+    stats = cache.stats()["story"]
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+async def test_entry_has_grace_period_and_lock_is_released(cache, fake_redis):
+    await cache.get_or_load("story", "1", Loader({"title": "t"}), ttl=60)
+
+    ttl = await fake_redis.ttl("test:story:1")
+    assert 60 < ttl <= 60 + settings.cache_stale_seconds
+    assert await fake_redis.exists("lock:test:story:1") == 0
+
+
+async def test_none_is_not_cached(cache):
+    loader = Loader(None)
+
+    assert await cache.get_or_load("story", "missing", loader, ttl=60) is None
+    assert await cache.get_or_load("story", "missing", loader, ttl=60) is None
+    assert loader.calls == 2
+
+
+async def test_invalidate(cache):
+    loader = Loader({"title": "t"})
+    await cache.get_or_load("chapter", "1", loader, ttl=60)
+
+    await cache.invalidate("chapter", "1")
+    await cache.get_or_load("chapter", "1", loader, ttl=60)
+
+    assert loader.calls == 2
+
+
+async def test_put_warms_cache(cache):
+    await cache.put("worldview", "1", {"world_setting": "九州"}, ttl=60)
+    loader = Loader({"world_setting": "stale"})
+
+    assert await cache.get_or_load("worldview", "1", loader, ttl=60) == {"world_setting": "九州"}
+    assert loader.calls == 0
+
+
+async def test_corrupt_entry_is_reloaded(cache, fake_redis):
+    await fake_redis.set("test:story:1", "not json")
+    loader = Loader({"title": "t"})
+
+    assert await cache.get_or_load("story", "1", loader, ttl=60) == {"title": "t"}
+    assert loader.calls == 1
+
+
+async def test_disabled_cache_always_loads(cache, monkeypatch):
+    monkeypatch.setattr(settings, "cache_enabled", False)
+    loader = Loader({"title": "t"})
+
+    await cache.get_or_load("story", "1", loader, ttl=60)
+    await cache.get_or_load("story", "1", loader, ttl=60)
+
+    assert loader.calls == 2
+
+
+async def test_redis_unavailable_falls_back_to_loader(cache, monkeypatch):
+    monkeypatch.setattr(async_redis, "_unavailable_until", float("inf"))
+    loader = Loader({"title": "t"})
+
+    assert await cache.get_or_load("story", "1", loader, ttl=60) == {"title": "t"}
+    assert loader.calls == 1
+
+
+async def test_cached_service_method_skips_database(db, user, story_factory, query_budget):
+    from app.services.story_service import StoryService
+
+    story_id = story_factory(user, chapters=1).id
+    service = StoryService(db)
+
+    first = await service.get_story_dto(story_id)
+    with query_budget(max_queries=0):
+        second = await service.get_story_dto(story_id)
+
+    assert first == second
+    assert second["user_id"] == user.id
+
+
+@pytest.mark.parametrize("delta, exp_in, draw, expected", [
+    (0.0, 0.1, 1e-9, False),   # 未记录回源耗时，从不提前刷新
+    (0.5, 300, 0.5, False),    # 距离过期还很远
+    (0.5, 0.1, 0.5, True),     # 临近过期且回源较慢
+    (0.5, 5.0, 1e-9, True),    # 极小概率事件：远离过期也会刷新
+])
+def test_should_refresh_early(monkeypatch, delta, exp_in, draw, expected):
+    monkeypatch.setattr(cache_service.random, "random", lambda: draw)
+    now = time.time()
+    entry = {"v": {}, "exp": now + exp_in, "delta": delta}
+
+    assert DTOCache._should_refresh_early(entry, now) is expected
+
+
+async def test_concurrent_misses_load_once(cache):
+    loader = Loader({"title": "t"})
+
+    results = await asyncio.gather(*(cache.get_or_load("story", "1", loader, ttl=60) for _ in range(10)))
+
+    assert results == [{"title": "t"}] * 10
+    assert loader.calls == 1
+
+
+async def test_waits_for_lock_holder(cache, fake_redis):
+    await fake_redis.set("lock:test:story:1", "other")
+
+    async def holder():
+        await asyncio.sleep(0.1)
+        await cache.put("story", "1", {"title": "from holder"}, ttl=60)
+
+    loader = Loader({"title": "t"})
+    task = asyncio.create_task(holder())
+    value = await cache.get_or_load("story", "1", loader, ttl=60)
+    await task
+
+    assert value == {"title": "from holder"}
+    assert loader.calls == 0
+
+
+async def test_loads_itself_when_lock_holder_gives_up(cache, fake_redis):
+    await fake_redis.set("lock:test:story:1", "other")
+
+    async def holder():
+        await asyncio.sleep(0.1)
+        await fake_redis.delete("lock:test:story:1")
+
+    loader = Loader({"title": "t"})
+    task = asyncio.create_task(holder())
+    value = await cache.get_or_load("story", "1", loader, ttl=60)
+    await task
+
+    assert value == {"title": "t"}
+    assert loader.calls == 1
+
+
+async def test_stale_entry_served_while_refreshing(cache, fake_redis):
+    await fake_redis.set("test:story:1", '{"v": {"title": "old"}, "exp": 0, "delta": 0.01}', ex=60)
+    loader = Loader({"title": "sync"})
+    refresher = Loader({"title": "new"})
+
+    value = await cache.get_or_load("story", "1", loader, ttl=60, refresher=refresher)
+    await asyncio.gather(*cache._background)
+
+    assert value == {"title": "old"}
+    assert (loader.calls, refresher.calls) == (0, 1)
+    assert await cache.get_or_load("story", "1", loader, ttl=60, refresher=refresher) == {"title": "new"}
+    stats = cache.stats()["story"]
+    assert (stats["stale_hits"], stats["background_refreshes"]) == (1, 1)
+    assert await fake_redis.exists("lock:test:story:1") == 0
+
+
+async def test_stale_entry_without_refresher_is_a_miss(cache, fake_redis):
+    await fake_redis.set("test:story:1", '{"v": {"title": "old"}, "exp": 0, "delta": 0.01}', ex=60)
+    loader = Loader({"title": "new"})
+
+    assert await cache.get_or_load("story", "1", loader, ttl=60) == {"title": "new"}
+    assert loader.calls == 1
+
+
+async def test_only_one_background_refresh(cache, fake_redis):
+    await fake_redis.set("test:story:1", '{"v": {"title": "old"}, "exp": 0, "delta": 0.01}', ex=60)
+    calls = []
+
+    def refresher():
+        # 刷新期间锁一直被持有
+        calls.append(1)
+        time.sleep(0.2)
+        return {"title": "new"}
+
+    await asyncio.gather(*(
+        cache.get_or_load("story", "1", Loader(None), ttl=60, refresher=refresher) for _ in range(5)
+    ))
+    await asyncio.gather(*cache._background)
+
+    assert len(calls) == 1
+
+
+def slow_refresher(value, started):
+    def refresher():
+        started.set()
+        time.sleep(0.2)
+        return value
+    return refresher
+
+
+@pytest.mark.parametrize("write", ["invalidate", "put"])
+async def test_refresh_racing_a_write_does_not_restore_old_data(cache, fake_redis, write):
+    await fake_redis.set("test:story:1", '{"v": {"title": "old"}, "exp": 0, "delta": 0.01}', ex=60)
+    started = threading.Event()
+
+    # 后台刷新读到的是写入之前的数据
+    await cache.get_or_load("story", "1", Loader(None), ttl=60,
+                            refresher=slow_refresher({"title": "before write"}, started))
+    await asyncio.to_thread(started.wait)
+    if write == "invalidate":
+        await cache.invalidate("story", "1")
+    else:
+        await cache.put("story", "1", {"title": "after write"}, ttl=60)
+    await asyncio.gather(*cache._background)
+
+    loader = Loader({"title": "reloaded"})
+    value = await cache.get_or_load("story", "1", loader, ttl=60)
+    assert value == ({"title": "reloaded"} if write == "invalidate" else {"title": "after write"})
+
+
+async def test_load_after_invalidate_is_cached(cache):
+    await cache.invalidate("story", "1")
+    loader = Loader({"title": "t"})
+
+    await cache.get_or_load("story", "1", loader, ttl=60)
+    await cache.get_or_load("story", "1", loader, ttl=60)
+
+    assert loader.calls == 1
@@ -0,0 +1,45 @@
+"""批量获取章节"""
+
+import json
+
+import pytest
+
+from app.config import settings
+
+
+@pytest.fixture
+def chapter_ids(db, user, story_factory):
+    from app.models import Chapter
+
+    story_id = story_factory(user, chapters=5, choices=0).id
+    rows = db.query(Chapter.id).filter(Chapter.story_id == story_id).order_by(Chapter.chapter_number).all()
+    return [row.id for row in rows]
+
+
+def test_both_modes_follow_request_order(client, auth_headers, chapter_ids, monkeypatch):
+    monkeypatch.setattr(settings, "chapter_batch_yield_per", 2)
+    requested = [chapter_ids[3], "missing-1", chapter_ids[0], chapter_ids[4], chapter_ids[1], "missing-2"]
+    url = f"/api/v1/chapters?ids={','.join(requested)}"
+
+    data = client.get(url, headers=auth_headers).json()["data"]
+    assert [chapter["id"] for chapter in data["chapters"]] == [i for i in requested if not i.startswith("missing")]
+    assert data["missing"] == ["missing-1", "missing-2"]
+
+    response = client.get(url + "&stream=true", headers=auth_headers)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == requested
+    assert [("error" in line) for line in lines] == [i.startswith("missing") for i in requested]
+
+
+def test_other_users_chapters_are_missing(client, chapter_ids, db):
+    from app.models import User
+    from app.utils.jwt_utils import JWTUtils
+
+    other = User(username="other_reader", user_id="other01", password_hash="x")
+    db.add(other)
+    db.commit()
+    headers = {"Authorization": f"Bearer {JWTUtils.generate_token(other.id, other.username)}"}
+
+    data = client.get(f"/api/v1/chapters?ids={chapter_ids[0]}", headers=headers).json()["data"]
+    assert data == {"chapters": [], "missing": [chapter_ids[0]]}
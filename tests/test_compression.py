@@ -0,0 +1,153 @@
+"""响应压缩中间件"""
+
+import asyncio
+import zlib
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware.compression import CompressionMiddleware, Compressor, negotiate_encoding
+
+BODY = "雨夜山门，" * 200
+EVENTS = [f"data: 第{i}段\n\n".encode("utf-8") for i in range(3)]
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("gzip, br", "br"),                    # q值相同按服务端优先级
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),              # q=0 表示拒绝
+    ("*;q=0.1, gzip;q=0", "br"),
+    ("identity", None),
+    ("", None),
+    ("GZIP;q=bad, gzip", "gzip"),          # 后出现的同名编码覆盖前者
+])
+def test_negotiate_encoding(accept, expected):
+    assert negotiate_encoding(accept, ["br", "zstd", "gzip"]) == expected
+
+
+async def body_endpoint(request):
+    headers = {"ETag": '"v1"'}
+    if request.query_params.get("small"):
+        return PlainTextResponse("short", headers=headers)
+    return PlainTextResponse(BODY, headers=headers)
+
+
+async def image_endpoint(request):
+    return Response(b"\x89PNG" * 500, media_type="image/png")
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[Route("/body", body_endpoint), Route("/image", image_endpoint)])
+    return TestClient(CompressionMiddleware(app, minimum_size=100))
+
+
+def test_whole_response_is_compressed(client):
+    response = client.get("/body", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == BODY
+    assert int(response.headers["content-length"]) < len(BODY.encode("utf-8"))
+    # 压缩后字节不同，强ETag降级为弱ETag
+    assert response.headers["etag"] == 'W/"v1"'
+
+
+def test_brotli_preferred_when_installed(client):
+    pytest.importorskip("brotli")
+    response = client.get("/body", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["content-encoding"] == "br"
+    assert response.text == BODY
+
+
+def test_small_response_is_not_compressed(client):
+    response = client.get("/body?small=1", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == '"v1"'
+
+
+def test_incompressible_type_passes_through(client):
+    response = client.get("/image", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.content == b"\x89PNG" * 500
+
+
+def test_no_accept_encoding_passes_through(client):
+    response = client.get("/body", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text == BODY
+
+
+async def run_asgi(app, accept_encoding: str):
+    """直接调用ASGI应用，返回发送的所有消息（保留分块边界）"""
+    scope = {
+        "type": "http", "method": "GET", "path": "/", "raw_path": b"/", "query_string": b"",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # 客户端一直保持连接
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+async def test_event_stream_is_flushed_per_event():
+    async def events():
+        for event in EVENTS:
+            yield event
+
+    async def app(scope, receive, send):
+        await StreamingResponse(events(), media_type="text/event-stream")(scope, receive, send)
+
+    messages = await run_asgi(CompressionMiddleware(app, minimum_size=100), "gzip")
+
+    start, *bodies = messages
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+
+    # 每个事件对应的压缩块单独解压即可得到完整事件，不会被压缩器扣留
+    decompressor = zlib.decompressobj(31)
+    chunks = [message["body"] for message in bodies if message["body"]]
+    for event, chunk in zip(EVENTS, chunks):
+        assert decompressor.decompress(chunk) == event
+    assert b"".join(decompressor.decompress(chunk) for chunk in chunks[len(EVENTS):]) == b""
+    assert decompressor.eof
+    assert bodies[-1]["more_body"] is False
+
+
+async def test_already_encoded_stream_passes_through():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/plain"), (b"content-encoding", b"gzip")]})
+        await send({"type": "http.response.body", "body": b"raw", "more_body": False})
+
+    messages = await run_asgi(CompressionMiddleware(app, minimum_size=1), "gzip")
+
+    assert messages[1]["body"] == b"raw"
+
+
+def test_compressor_subclass_must_implement_interface():
+    class Incomplete(Compressor):
+        def compress(self, data: bytes) -> bytes:
+            return data
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,25 @@
+"""条件请求"""
+
+
+def test_story_list_revalidates_after_delete(client, db, user, auth_headers, story_factory):
+    from app.models import Story
+
+    older = story_factory(user, chapters=0).id
+    story_factory(user, chapters=0)
+
+    response = client.get("/api/v1/stories/", headers=auth_headers)
+    assert response.status_code == 200
+    assert "last-modified" not in response.headers
+    etag = response.headers["etag"]
+    assert client.get("/api/v1/stories/", headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+
+    db.query(Story).filter(Story.id == older).delete()
+    db.commit()
+
+    response = client.get("/api/v1/stories/", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["data"]["stories"]) == 1
+    response = client.get("/api/v1/stories/", headers={
+        **auth_headers, "If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"
+    })
+    assert response.status_code == 200
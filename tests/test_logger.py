@@ -0,0 +1,41 @@
+"""按模块设置日志级别"""
+
+import pytest
+from loguru import logger
+
+from app.config import settings
+from app.utils.logger import LEVEL_NO, LogFilter, setup_logger
+
+
+def test_min_level_covers_module_overrides():
+    log_filter = LogFilter("INFO", {"app.services.cache_service": "DEBUG", "app.database": "WARNING"}, {})
+
+    assert log_filter.min_level == LEVEL_NO["DEBUG"]
+    assert LogFilter("INFO", {"app.database": "WARNING"}, {}).min_level == LEVEL_NO["INFO"]
+
+
+@pytest.fixture
+def restore_logger(monkeypatch):
+    """测试中重新配置了日志，结束后按原有配置恢复"""
+    yield
+    monkeypatch.undo()
+    setup_logger()
+
+
+@pytest.mark.parametrize("mode", ["development", "production"])
+def test_module_can_be_more_verbose_than_default(restore_logger, capsys, monkeypatch, mode):
+    monkeypatch.setattr(settings, "log_mode", mode)
+    monkeypatch.setattr(settings, "log_level", "INFO")
+    monkeypatch.setattr(settings, "log_module_levels", {"app.services.cache_service": "DEBUG"})
+    setup_logger()
+
+    def log_from(module):
+        return logger.patch(lambda record: record.update(name=module))
+
+    log_from("app.services.cache_service").debug("cache detail")
+    log_from("app.services.story_service").debug("story detail")
+    logger.complete()
+
+    output = capsys.readouterr().out
+    assert "cache detail" in output
+    assert "story detail" not in output
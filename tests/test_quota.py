@@ -0,0 +1,84 @@
+"""用户并发生成与字符预算配额"""
+
+import pytest
+
+from app.config import settings
+from app.database import async_redis
+from app.services.quota_service import QuotaService
+from app.utils.exceptions import QuotaExceededException
+
+
+@pytest.fixture
+def quota(monkeypatch):
+    monkeypatch.setattr(settings, "quota_max_concurrent_generations", 2)
+    monkeypatch.setattr(settings, "quota_daily_characters", 1000)
+    return QuotaService()
+
+
+@pytest.mark.parametrize("redis_up", [True, False], ids=["redis", "local"])
+async def test_concurrent_slots(quota, monkeypatch, redis_up):
+    if not redis_up:
+        monkeypatch.setattr(async_redis, "_unavailable_until", float("inf"))
+
+    async with quota.generation_slot("u1"):
+        async with quota.generation_slot("u1"):
+            assert await quota.in_flight("u1") == 2
+            with pytest.raises(QuotaExceededException):
+                async with quota.generation_slot("u1"):
+                    pass
+            # 其他用户不受影响
+            async with quota.generation_slot("u2"):
+                pass
+
+    assert await quota.in_flight("u1") == 0
+
+
+async def test_slot_released_on_error(quota):
+    with pytest.raises(RuntimeError):
+        async with quota.generation_slot("u1"):
+            raise RuntimeError("生成失败")
+
+    assert await quota.in_flight("u1") == 0
+
+
+async def test_slot_expires_if_never_released(quota, fake_redis):
+    async with quota.generation_slot("u1"):
+        ttl = await fake_redis.ttl("quota:inflight:u1")
+
+    assert 0 < ttl <= settings.quota_slot_ttl
+
+
+async def test_daily_character_budget(quota):
+    await quota.record_usage("u1", 600)
+    async with quota.generation_slot("u1"):
+        pass
+
+    await quota.record_usage("u1", 400)
+    await quota.record_usage("u1", 0)
+    with pytest.raises(QuotaExceededException) as exc_info:
+        async with quota.generation_slot("u1"):
+            pass
+
+    assert exc_info.value.details["used_characters"] == 1000
+    assert await quota.in_flight("u1") == 0
+
+
+async def test_usage_counts_rolling_window(quota, fake_redis):
+    await fake_redis.set("quota:chars:u1:0", 500)  # 早已移出24小时窗口的分桶
+    await quota.record_usage("u1", 120)
+
+    usage = await quota.usage("u1")
+
+    assert usage["used_characters"] == 120
+    assert usage["remaining_characters"] == 880
+    assert usage["in_flight_generations"] == 0
+    assert usage["window_hours"] == 24
+
+
+def test_usage_endpoint(client, auth_headers):
+    response = client.get("/api/v1/auth/me/usage", headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    data = response.json()["data"]
+    assert data["used_characters"] == 0
+    assert data["daily_characters"] == settings.quota_daily_characters
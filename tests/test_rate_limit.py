@@ -0,0 +1,134 @@
+"""令牌桶限流"""
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.database import async_redis
+from app.services import rate_limit_service
+from app.services.rate_limit_service import RateLimiter, RateLimitResult, parse_rate
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limits", {"test": "3/minute"})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可控的时间，便于验证令牌补充"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(rate_limit_service.time, "time", lambda: now[0])
+    return now
+
+
+def test_parse_rate():
+    assert parse_rate("10/hour") == (10, 3600)
+    assert parse_rate("5/ second") == (5, 1)
+    with pytest.raises(KeyError):
+        parse_rate("5/fortnight")
+
+
+def test_headers():
+    allowed = RateLimitResult(allowed=True, limit=10, remaining=7, period=3600, retry_after=0, reset_after=1080.2)
+    assert allowed.headers == {
+        "RateLimit-Limit": "10",
+        "RateLimit-Remaining": "7",
+        "RateLimit-Reset": "1081",
+        "RateLimit-Policy": "10;w=3600",
+    }
+
+    denied = RateLimitResult(allowed=False, limit=10, remaining=0, period=3600, retry_after=0.2, reset_after=3600)
+    assert denied.headers["Retry-After"] == "1"
+
+
+@pytest.mark.parametrize("redis_up", [True, False], ids=["redis", "local"])
+async def test_bucket_allows_burst_then_refills(limits, clock, monkeypatch, redis_up):
+    if not redis_up:
+        monkeypatch.setattr(async_redis, "_unavailable_until", float("inf"))
+    limiter = RateLimiter()
+
+    results = [await limiter.hit("test", "u1") for _ in range(4)]
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results] == [2, 1, 0, 0]
+    # 每20秒补充一个令牌
+    assert results[-1].retry_after == pytest.approx(20, abs=0.01)
+
+    # 其他用户不受影响
+    assert (await limiter.hit("test", "u2")).allowed
+
+    clock[0] += 20
+    assert (await limiter.hit("test", "u1")).allowed
+    assert not (await limiter.hit("test", "u1")).allowed
+
+
+async def test_bucket_state_lives_in_redis(limits, clock, fake_redis):
+    await RateLimiter().hit("test", "u1")
+
+    # 另一个进程（新的限流器实例）看到同一个桶
+    result = await RateLimiter().hit("test", "u1")
+    assert result.remaining == 1
+    assert 0 < await fake_redis.pttl("ratelimit:test:u1") <= 60_000
+
+
+def limited_client(peer: str) -> TestClient:
+    from app.api.rate_limit import rate_limit
+
+    app = FastAPI()
+
+    @app.get("/limited")
+    async def limited(_: RateLimitResult = Depends(rate_limit("test", by="ip"))):
+        return {"ok": True}
+
+    return TestClient(app, client=(peer, 50000))
+
+
+def test_dependency_returns_429_with_retry_after(limits):
+    client = limited_client("203.0.113.7")
+    responses = [client.get("/limited") for _ in range(4)]
+
+    assert [r.status_code for r in responses] == [200, 200, 200, 429]
+    assert responses[0].headers["RateLimit-Remaining"] == "2"
+    assert int(responses[-1].headers["Retry-After"]) >= 1
+
+
+def test_forwarded_header_ignored_without_trusted_proxy(limits):
+    client = limited_client("203.0.113.7")
+    statuses = [
+        client.get("/limited", headers={"X-Forwarded-For": f"10.0.0.{i}"}).status_code for i in range(4)
+    ]
+
+    # 伪造的 X-Forwarded-For 不能换来新的令牌桶
+    assert statuses == [200, 200, 200, 429]
+
+
+def test_forwarded_header_from_trusted_proxy(limits, monkeypatch):
+    monkeypatch.setattr(settings, "trusted_proxies", ["10.0.0.0/8"])
+    client = limited_client("10.0.0.1")
+
+    def get(forwarded):
+        return client.get("/limited", headers={"X-Forwarded-For": forwarded}).status_code
+
+    # 最左侧的值由客户端控制，按代理追加的最右侧不可信地址计数
+    assert [get(f"198.51.100.{i}, 203.0.113.7") for i in range(4)] == [200, 200, 200, 429]
+    assert get("203.0.113.8, 10.0.0.2") == 200
+
+
+def test_story_create_limited_only_with_theme(client, auth_headers, monkeypatch):
+    from app.services.story_service import StoryService
+
+    monkeypatch.setattr(settings, "rate_limits", {**settings.rate_limits, "story_create": "1/hour"})
+
+    async def create_story_with_worldview(self, style, title=None, user_id=None, story_theme=None):
+        return await self.create_story(style=style, title=title, user_id=user_id)
+
+    monkeypatch.setattr(StoryService, "create_story_with_worldview", create_story_with_worldview)
+
+    def create(**extra):
+        return client.post("/api/v1/stories/", json={"style": "修仙", "title": "t", **extra}, headers=auth_headers)
+
+    assert create(theme="复仇").status_code == 200
+    assert create(theme="复仇").status_code == 429
+    # 不生成世界观的创建不消耗限流额度
+    assert create().status_code == 200
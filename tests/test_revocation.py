@@ -0,0 +1,123 @@
+"""布隆过滤器与令牌吊销列表"""
+
+import time
+
+import pytest
+
+from app.database import async_redis
+from app.utils import auth_cache
+from app.utils.bloom import BloomFilter
+from app.utils.revocation import REVOCATION_KEY, RevocationList
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"user:{i}")
+
+    assert all(f"user:{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other:{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+@pytest.fixture
+def revocations():
+    return RevocationList()
+
+
+async def test_unsynced_filter_defers_to_database(revocations):
+    assert not revocations.fresh
+    assert await revocations.is_revoked("u1") is None
+
+
+async def test_stale_filter_defers_to_database(revocations, monkeypatch):
+    await revocations.refresh()
+    assert await revocations.is_revoked("u1") is False
+
+    monkeypatch.setattr(revocations, "_refreshed_at", time.monotonic() - 3600)
+    assert await revocations.is_revoked("u1") is None
+
+
+async def test_revoke_is_visible_before_redis_write(revocations, fake_redis):
+    revocations.revoke_user("u1")
+
+    # 尚未写入Redis、布隆过滤器也未同步，仍然立即生效
+    assert await revocations.is_revoked("u1") is True
+
+    assert await revocations.flush_pending()
+    assert revocations._pending == {}
+    assert await fake_redis.zscore(REVOCATION_KEY, "user:u1") > time.time()
+
+
+async def test_failed_write_is_retried(revocations, fake_redis, monkeypatch):
+    monkeypatch.setattr(async_redis, "_unavailable_until", float("inf"))
+    revocations.revoke_token("jti-1", time.time() + 60)
+
+    assert not await revocations.flush_pending()
+    assert "jti:jti-1" in revocations._pending
+
+    monkeypatch.setattr(async_redis, "_unavailable_until", 0.0)
+    assert await revocations.flush_pending()
+    assert await fake_redis.zscore(REVOCATION_KEY, "jti:jti-1") is not None
+
+
+async def test_refresh_mirrors_other_processes(revocations, fake_redis):
+    now = time.time()
+    await fake_redis.zadd(REVOCATION_KEY, {"user:u1": now + 60, "jti:old": now - 1})
+
+    await revocations.refresh()
+
+    assert await revocations.is_revoked("u1") is True
+    assert await revocations.is_revoked("u2", "jti-2") is False
+    # 过期条目在刷新时清理
+    assert await fake_redis.zscore(REVOCATION_KEY, "jti:old") is None
+
+
+async def test_restored_user_is_confirmed_by_redis(revocations):
+    revocations.revoke_user("u1")
+    await revocations.flush_pending()
+    await revocations.refresh()
+
+    revocations.restore_user("u1")
+    assert await revocations.is_revoked("u1") is False
+
+    # 布隆过滤器仍然命中，由Redis确认已恢复
+    await revocations.flush_pending()
+    assert "user:u1" in revocations._bloom
+    assert await revocations.is_revoked("u1") is False
+
+
+async def test_bloom_hit_without_redis_defers_to_database(revocations, fake_redis, monkeypatch):
+    await fake_redis.zadd(REVOCATION_KEY, {"user:u1": time.time() + 60})
+    await revocations.refresh()
+
+    monkeypatch.setattr(async_redis, "_unavailable_until", float("inf"))
+    assert await revocations.is_revoked("u1") is None
+
+
+@pytest.fixture
+def session_revocations(monkeypatch):
+    revocations = RevocationList()
+    monkeypatch.setattr(auth_cache, "revocation_list", revocations)
+    return revocations
+
+
+def test_deactivation_is_applied_after_commit(db, user, session_revocations):
+    user.is_active = False
+    db.flush()
+    assert session_revocations._pending == {}
+
+    db.commit()
+    assert session_revocations._pending[f"user:{user.id}"] is not None
+
+    user.is_active = True
+    db.commit()
+    assert session_revocations._pending[f"user:{user.id}"] is None
+
+
+def test_rolled_back_deactivation_is_discarded(db, user, session_revocations):
+    user.is_active = False
+    db.flush()
+    db.rollback()
+
+    assert session_revocations._pending == {}
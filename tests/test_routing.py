@@ -0,0 +1,105 @@
+"""读写分离会话与副本故障回退"""
+
+import pytest
+from sqlalchemy import create_engine, event
+
+from app.database.connection import Base
+from app.database.routing import ReplicaPool, RoutingSession, read_only
+from app.models import User
+
+
+class UserReader:
+    def __init__(self, db):
+        self.db = db
+
+    @read_only
+    def get_user(self, user_id):
+        return self.db.query(User).filter(User.id == user_id).first()
+
+    @read_only
+    def list_users(self):
+        return self.db.query(User).order_by(User.username).all()
+
+
+@pytest.fixture
+def engines(tmp_path):
+    """主库和指向同一文件的"副本"，副本可模拟查询中途断开"""
+    url = f"sqlite:///{tmp_path / 'routing.db'}"
+    primary = create_engine(url)
+    replica = create_engine(url)
+    Base.metadata.create_all(primary)
+    replica.failing = False
+    replica.queries = 0
+
+    @event.listens_for(replica, "connect")
+    def install_interrupt(dbapi_connection, connection_record):
+        # 查询执行中途被中断（sqlite3.OperationalError: interrupted）
+        dbapi_connection.set_progress_handler(lambda: 1 if replica.failing else 0, 1)
+
+    @event.listens_for(replica, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        replica.queries += 1
+
+    @event.listens_for(replica, "handle_error")
+    def disconnect(context):
+        if replica.failing:
+            context.is_disconnect = True
+
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+@pytest.fixture
+def session(engines):
+    primary, replica = engines
+    session = RoutingSession(bind=primary, replicas=ReplicaPool([replica]), autoflush=False)
+    session.add(User(id="u1", username="alice", user_id="alice01", password_hash="x"))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_reads_go_to_replica(session, engines):
+    _, replica = engines
+    user = UserReader(session).get_user("u1")
+
+    assert replica.queries == 1
+    # 结果并入调用方会话，修改可以直接提交
+    assert user in session
+    user.username = "alice2"
+    session.commit()
+    assert session.query(User.username).filter(User.id == "u1").scalar() == "alice2"
+
+
+def test_replica_dropped_mid_query_leaves_session_usable(session, engines):
+    _, replica = engines
+    replica.failing = True
+
+    user = UserReader(session).get_user("u1")
+
+    assert user.username == "alice"
+    assert session.replicas.choose() is None
+    session.add(User(id="u2", username="bob", user_id="bob01", password_hash="x"))
+    session.commit()
+    assert {u.id for u in UserReader(session).list_users()} == {"u1", "u2"}
+
+
+def test_flushed_writes_are_read_from_primary(session, engines):
+    _, replica = engines
+    session.add(User(id="u2", username="bob", user_id="bob01", password_hash="x"))
+    session.flush()
+    assert not (session.new or session.dirty or session.deleted)
+
+    assert UserReader(session).get_user("u2") is not None
+    assert replica.queries == 0
+    session.rollback()
+
+
+def test_open_primary_transaction_keeps_reads_on_primary(session, engines):
+    _, replica = engines
+    session.query(User).count()
+
+    UserReader(session).get_user("u1")
+
+    assert replica.queries == 0
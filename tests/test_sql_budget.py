@@ -0,0 +1,37 @@
+"""SQL查询预算：聚合接口的语句数不随章节数增长"""
+
+import pytest
+
+from app.utils.sql_profiler import QueryBudgetExceeded, normalize_statement
+
+
+def test_normalize_statement_collapses_literals_and_in_lists():
+    assert normalize_statement("SELECT * FROM t WHERE id = 5 AND name = 'a''b'") == \
+        "SELECT * FROM t WHERE id = ? AND name = ?"
+    assert normalize_statement("SELECT * FROM t WHERE id IN (?, ?, ?)") == \
+        normalize_statement("SELECT * FROM t WHERE id IN (?)")
+
+
+def test_query_budget_reports_repeated_shapes(db, query_budget):
+    from app.models import User
+
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+        with query_budget(max_queries=10, max_repeats=1):
+            for user_id in ("a", "b"):
+                db.query(User).filter(User.id == user_id).first()
+
+
+@pytest.mark.parametrize("chapters", [1, 10])
+def test_story_bundle_query_budget(client, query_budget, user, auth_headers, story_factory, chapters):
+    url = f"/api/v1/stories/{story_factory(user, chapters=chapters).id}/bundle"
+
+    # 用户查询、故事、世界观、章节目录、最新章节、选择项各一条
+    with query_budget(max_queries=6, max_repeats=1) as profile:
+        response = client.get(url, headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    data = response.json()["data"]
+    assert len(data["chapters"]) == chapters
+    assert data["latest_chapter"]["chapter_number"] == chapters
+    assert len(data["choices"]) == 3
+    assert profile.count <= 6